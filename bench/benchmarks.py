@@ -0,0 +1,279 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks of the minesweeper's hot paths.
+
+The engine (:func:`minesweeper.make_game`, :func:`minesweeper.neighborhood`,
+:func:`minesweeper.get_state`, :func:`minesweeper.get_bombs_grid`,
+:func:`minesweeper.reveal_all_cells_from`), the console renderer
+(:func:`console_main.display_game`) and the graphical board
+(``graphicalboard.__redraw``) are measured for several sizes of board
+and densities of bombs. Each measure records the median duration of a
+call over several repetitions and the peak memory allocated by a
+single call (with ``tracemalloc``). Boards are generated from fixed
+seeds, so two runs measure the same work.
+
+Results are written as JSON. Given a baseline (a previous result file),
+the run fails when a measure is slower, or uses more memory, than the
+baseline by more than the tolerance.
+
+The graphical benchmarks need a display: when ``DISPLAY`` is not set,
+they are run under a virtual X server (``Xvfb``) if it is installed,
+and skipped otherwise.
+
+Usage::
+
+    python3 bench/benchmarks.py [--quick] [--gui] [--output FILE]
+                                [--baseline FILE] [--tolerance T]
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tracemalloc
+import subprocess
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import minesweeper as ms
+import console_main
+
+#: (width, height) of the boards
+SIZES = [(30, 16), (100, 100), (300, 300), (1000, 1000)]
+QUICK_SIZES = [(30, 16), (100, 100)]
+#: proportions of bombs
+DENSITIES = [0.05, 0.2]
+#: size of the boards drawn by the graphical benchmarks
+GUI_SIZES = [(16, 16), (30, 30)]
+
+
+def measure (function, repeat, number=1):
+    """
+    :param function: the function to measure, called without argument
+    :type function: function
+    :param repeat: number of timings
+    :type repeat: int
+    :param number: [optional] number of calls per timing (default = 1)
+    :type number: int
+    :return: the median duration of a call in seconds and the peak
+             memory allocated by one more call, in bytes
+    :rtype: tuple (float, int)
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    times.sort()
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return times[len(times) // 2], peak
+
+def __result (name, params, function, repeat, number=1, **extra):
+    """
+    :return: the result of measuring function, as stored in the JSON file
+    :rtype: dict
+    """
+    duration, peak = measure(function, repeat, number)
+    result = {'name' : name, 'params' : params, 'time' : duration, 'peak_memory' : peak}
+    result.update(extra)
+    print('{:28} {:36} {:12.6f} s {:12d} B'.format(name, json.dumps(params), duration, peak))
+    return result
+
+def __game (width, height, density, seed=0):
+    return ms.make_game(width, height, int(width*height*density), seed=seed)
+
+def bench_engine (sizes, densities, repeat):
+    """
+    :return: the results of the engine's benchmarks
+    :rtype: list of dict
+    """
+    results = []
+    for width, height in sizes:
+        for density in densities:
+            params = {'width' : width, 'height' : height, 'density' : density}
+            nbombs = int(width*height*density)
+            game = __game(width, height, density)
+            # the adjacency table, if any, is built by the first reveal
+            played = __game(width, height, density)
+            ms.reveal_all_cells_from(played, height // 2, width // 2)
+            results.append(__result('make_game', params,
+                                    lambda: ms.make_game(width, height, nbombs, seed=0),
+                                    repeat, bytes_per_cell=ms.grid_memory(game) / (width*height),
+                                    adjacency_bytes_per_cell=ms.adjacency_memory(played) / (width*height)))
+            results.append(__result('get_state', params, lambda: ms.get_state(game),
+                                    repeat, number=10000))
+            results.append(__result('get_bombs_grid', params, lambda: ms.get_bombs_grid(game),
+                                    repeat, number=100))
+
+            # the time of a new game is included, and reported apart
+            def reveal_all ():
+                g = __game(width, height, density)
+                for x in range(0, height, 7):
+                    for y in range(0, width, 7):
+                        if not ms.is_bomb(ms.get_cell(g, x, y)):
+                            ms.reveal_all_cells_from(g, x, y)
+            generation, _ = measure(lambda: __game(width, height, density), 1)
+            results.append(__result('reveal_all_cells_from', params, reveal_all, repeat,
+                                    generation_time=generation))
+        params = {'width' : width, 'height' : height}
+        results.append(__result('neighborhood', params,
+                                lambda: [ms.neighborhood(x, y, height, width)
+                                         for x in range(height) for y in range(width)],
+                                repeat))
+    return results
+
+def bench_console (sizes, repeat):
+    """
+    :return: the results of the console's benchmarks
+    :rtype: list of dict
+    """
+    results = []
+    for width, height in sizes:
+        if width*height > 100*100:
+            continue
+        game = __game(width, height, 0.1)
+        ms.reveal_all_cells_from(game, height // 2, width // 2)
+        params = {'width' : width, 'height' : height}
+
+        def display ():
+            with contextlib.redirect_stdout(io.StringIO()):
+                console_main.display_game(game)
+        results.append(__result('display_game', params, display, repeat))
+    return results
+
+def bench_gui (sizes, repeat):
+    """
+    :return: the results of the graphical board's benchmarks
+    :rtype: list of dict
+    """
+    import tkinter as tk
+    import graphicalboard
+    redraw = getattr(graphicalboard, '__redraw')
+    results = []
+    for width, height in sizes:
+        win = tk.Tk()
+        graphicalboard.img = graphicalboard.load_images(win)
+        game = __game(width, height, 0.1)
+        b = []
+        for i in range(width):
+            b.append([])
+            for j in range(height):
+                button = tk.Button(win, padx=0, pady=0, width=19, height=19,
+                                   image=graphicalboard.img[9])
+                button.grid(column=i, row=j)
+                b[i].append(button)
+        win.update()
+        changed = ms.reveal_all_cells_from(game, height // 2, width // 2)
+        params = {'width' : width, 'height' : height}
+
+        def full ():
+            redraw(b, game, 0, 0)
+            win.update()
+
+        def dirty ():
+            redraw(b, game, 0, 0, changed)
+            win.update()
+        results.append(__result('redraw_full', params, full, repeat))
+        results.append(__result('redraw_dirty', params, dirty, repeat,
+                                changed_cells=len(changed)))
+        win.destroy()
+    return results
+
+def __with_display (argv):
+    """
+    run this script again, with argv, under a virtual X server.
+
+    :return: the exit status of the run, or ``None`` if Xvfb is missing
+    :rtype: int
+    """
+    xvfb = shutil.which('Xvfb')
+    if xvfb is None:
+        return None
+    server = subprocess.Popen([xvfb, ':99', '-screen', '0', '1280x1024x24', '-nolisten', 'tcp'],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        time.sleep(1)
+        env = dict(os.environ, DISPLAY=':99')
+        return subprocess.call([sys.executable, os.path.abspath(__file__)] + argv, env=env)
+    finally:
+        server.terminate()
+        server.wait()
+
+def compare (results, baseline, tolerance):
+    """
+    :param results: the results of a run
+    :type results: list of dict
+    :param baseline: the results of a previous run
+    :type baseline: list of dict
+    :param tolerance: the accepted relative increase
+    :type tolerance: float
+    :return: the descriptions of the measures of results worse than in
+             baseline by more than tolerance
+    :rtype: list of str
+    """
+    def key (result):
+        return (result['name'], json.dumps(result['params'], sort_keys=True))
+    reference = {key(r) : r for r in baseline}
+    regressions = []
+    for result in results:
+        old = reference.get(key(result))
+        if old is None:
+            continue
+        for field in ('time', 'peak_memory'):
+            if result[field] > old[field] * (1 + tolerance):
+                regressions.append('{} {}: {} {} -> {}'.format(result['name'],
+                                   json.dumps(result['params']), field, old[field], result[field]))
+    return regressions
+
+def main (argv):
+    parser = argparse.ArgumentParser(description='Benchmarks of the minesweeper.')
+    parser.add_argument('--quick', action='store_true', help='only small boards')
+    parser.add_argument('--gui', action='store_true', help='also run the graphical benchmarks')
+    parser.add_argument('--repeat', type=int, default=5, help='timed calls per measure')
+    parser.add_argument('--output', default='bench_results.json', help='JSON file of the results')
+    parser.add_argument('--baseline', help='JSON file of the results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='accepted relative regression (default 0.5)')
+    args = parser.parse_args(argv)
+
+    if args.gui and not os.environ.get('DISPLAY'):
+        status = __with_display(argv)
+        if status is not None:
+            return status
+        print('no DISPLAY and no Xvfb: the graphical benchmarks are skipped')
+        args.gui = False
+
+    sizes = QUICK_SIZES if args.quick else SIZES
+    results = bench_engine(sizes, DENSITIES, args.repeat)
+    results += bench_console(sizes, args.repeat)
+    if args.gui:
+        results += bench_gui(GUI_SIZES, args.repeat)
+    with open(args.output, 'w') as f:
+        json.dump({'python' : platform.python_version(),
+                   'platform' : platform.platform(),
+                   'date' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+                   'results' : results}, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        for regression in regressions:
+            print('REGRESSION', regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
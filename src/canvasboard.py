@@ -0,0 +1,322 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`canvasboard` module
+
+This module implements another graphical board for a minesweeper game,
+meant for large games. Instead of one button per cell, the board is
+drawn on a single ``tk.Canvas`` and clicks are mapped to cells by
+arithmetic. When the board is larger than the window, it can be
+scrolled and only the cells of the visible part are drawn, so opening
+a 1000x1000 game costs no more than opening a 30x30 one. The board can
+be zoomed in and out with the ``+`` and ``-`` keys, and moves are
+undone and redone with Ctrl+Z and Ctrl+Y.
+
+It uses the same icons and the same functions of :mod:`minesweeper` as
+:mod:`graphicalboard`.
+
+To draw and run a minesweeper game, one has to:
+
+* create a minesweeper game g
+* create a canvas board from the minesweeper g
+
+"""
+
+import minesweeper
+import graphicalboard
+import journal as jn
+import tkinter as tk
+from functools import partial
+
+#: maximal zoom factor of the board
+MAX_ZOOM = 4
+#: maximal size in pixels of the visible part of the board
+VIEW_WIDTH = 1000
+VIEW_HEIGHT = 700
+
+
+def create (g, moves=None):
+    """
+    This function creates the canvas board from a game and launches the
+    event loop.
+
+    :param g: the minesweeper game
+    :type g: game
+    :param moves: [optional] the journal where the moves are recorded
+    :type moves: dict
+    :return: None
+    """
+    win = tk.Tk()
+    win.title ('Minesweeper')
+    width,height = (minesweeper.get_width(g),minesweeper.get_height(g))
+    cell = graphicalboard.ICON_SIZE
+    canvas = tk.Canvas(win, highlightthickness=0,
+                       width=min(width*cell, VIEW_WIDTH),
+                       height=min(height*cell, VIEW_HEIGHT),
+                       scrollregion=(0, 0, width*cell, height*cell))
+    xbar = tk.Scrollbar(win, orient=tk.HORIZONTAL, command=canvas.xview)
+    ybar = tk.Scrollbar(win, orient=tk.VERTICAL, command=canvas.yview)
+    board = {'win' : win,
+             'canvas' : canvas,
+             'game' : g,
+             'journal' : moves,
+             'img' : graphicalboard.load_images(win),
+             'zoom' : 1,
+             'cell' : cell,
+             'items' : {},
+             'last' : None,
+             'shade' : None,
+             'pending' : False}
+    canvas.config(xscrollcommand=partial(__scrolled, board, xbar),
+                  yscrollcommand=partial(__scrolled, board, ybar))
+    canvas.grid(column=0, row=0, sticky=tk.NSEW)
+    xbar.grid(column=0, row=1, sticky=tk.EW)
+    ybar.grid(column=1, row=0, sticky=tk.NS)
+    win.columnconfigure(0, weight=1)
+    win.rowconfigure(0, weight=1)
+    canvas.bind("<Button-1>", partial(__changestate, board))
+    canvas.bind("<Button-3>", partial(__changeflag, board))
+    canvas.bind("<Button-2>", partial(__chord, board))
+    canvas.bind("<MouseWheel>", partial(__wheel, board))
+    canvas.bind("<Button-4>", partial(__wheel, board))
+    canvas.bind("<Button-5>", partial(__wheel, board))
+    canvas.bind("<Configure>", partial(__schedule_view, board))
+    win.bind("<plus>", partial(__zoom, board, 1))
+    win.bind("<KP_Add>", partial(__zoom, board, 1))
+    win.bind("<minus>", partial(__zoom, board, -1))
+    win.bind("<KP_Subtract>", partial(__zoom, board, -1))
+    win.bind("<Control-z>", partial(__undo, board, 'Z'))
+    win.bind("<Control-y>", partial(__undo, board, 'Y'))
+    win.mainloop()
+
+def __scrolled (board, bar, first, last):
+    """
+    This function is called when the visible part of the canvas changes.
+    It updates the scrollbar and schedules the drawing of the new view.
+    """
+    bar.set(first, last)
+    __schedule_view(board)
+
+def __schedule_view (board, evt=None):
+    """
+    This function schedules a single drawing of the visible cells once
+    the pending events are handled, however many times it is called.
+    """
+    if not board['pending']:
+        board['pending'] = True
+        board['win'].after_idle(__draw_view, board)
+
+def __wheel (board, evt):
+    """
+    This function scrolls the board vertically, or horizontally when
+    shift is pressed, on mouse wheel events.
+    """
+    if evt.num == 4 or evt.delta > 0:
+        step = -1
+    else:
+        step = 1
+    if evt.state & 0x1:
+        board['canvas'].xview_scroll(step, 'units')
+    else:
+        board['canvas'].yview_scroll(step, 'units')
+
+def __zoom (board, step, evt=None):
+    """
+    This function changes the zoom factor of the board by step. Icons
+    of the new zoom come from the cache of :func:`graphicalboard.load_images`.
+    """
+    zoom = board['zoom'] + step
+    if not 1 <= zoom <= MAX_ZOOM:
+        return
+    canvas = board['canvas']
+    g = board['game']
+    width,height = (minesweeper.get_width(g),minesweeper.get_height(g))
+    board['zoom'] = zoom
+    board['cell'] = cell = graphicalboard.ICON_SIZE*zoom
+    board['img'] = graphicalboard.load_images(board['win'], zoom)
+    canvas.delete(tk.ALL)
+    board['items'] = {}
+    canvas.config(scrollregion=(0, 0, width*cell, height*cell))
+    if board['shade'] is not None:
+        __shade(board)
+    __schedule_view(board)
+
+def __draw_view (board):
+    """
+    This function draws the cells of the visible part of the board and
+    deletes the items of the cells which are no more visible.
+
+    :param board: the canvas board
+    :type board: dict
+    """
+    board['pending'] = False
+    canvas = board['canvas']
+    g = board['game']
+    width,height = (minesweeper.get_width(g),minesweeper.get_height(g))
+    cell = board['cell']
+    left = int(canvas.canvasx(0)) // cell
+    top = int(canvas.canvasy(0)) // cell
+    right = min(width, int(canvas.canvasx(canvas.winfo_width())) // cell + 1)
+    bottom = min(height, int(canvas.canvasy(canvas.winfo_height())) // cell + 1)
+    items = board['items']
+    for (x,y) in list(items):
+        if not (top <= x < bottom and left <= y < right):
+            canvas.delete(items.pop((x,y)))
+    for x in range(top, bottom):
+        for y in range(left, right):
+            if (x,y) not in items:
+                items[x,y] = canvas.create_image(y*cell, x*cell, anchor=tk.NW,
+                                                 image=__image(board,x,y))
+    if board['shade'] is not None:
+        canvas.tag_raise(board['shade'])
+
+def __image (board, x, y):
+    """
+    :return: the icon of the cell (x,y)
+    :rtype: ``PhotoImage``
+    """
+    img = board['img']
+    cell = minesweeper.get_cell(board['game'],x,y)
+    if minesweeper.is_revealed(cell):
+        if minesweeper.is_bomb(cell):
+            if board['last'] == (x,y):
+                return img[11]
+            return img[10]
+        return img[minesweeper.number_of_bombs_in_neighborhood(cell)]
+    elif minesweeper.is_hypothetic_bomb(cell):
+        return img[12]
+    return img[9]
+
+def __redraw (board, cells=None):
+    """
+    This function redraws the given cells, or all the visible cells if
+    cells is ``None``. Cells out of the visible part are skipped: they
+    are drawn when scrolled into view.
+
+    :param board: the canvas board
+    :type board: dict
+    :param cells: [optional] the coordinates of the cells which changed
+    :type cells: list of tuple
+    """
+    canvas = board['canvas']
+    items = board['items']
+    if cells is None:
+        cells = list(items)
+    for key in cells:
+        item = items.get(key)
+        if item is not None:
+            canvas.itemconfig(item, image=__image(board,*key))
+
+def __cell_at (board, evt):
+    """
+    :return: the coordinates of the cell under the mouse, or ``None``
+    :rtype: tuple
+    """
+    canvas = board['canvas']
+    g = board['game']
+    x = int(canvas.canvasy(evt.y)) // board['cell']
+    y = int(canvas.canvasx(evt.x)) // board['cell']
+    if 0 <= x < minesweeper.get_height(g) and 0 <= y < minesweeper.get_width(g):
+        return (x,y)
+    return None
+
+def __changestate (board, evt):
+    """
+    This function is called on left-click on the canvas.
+    """
+    cell = __cell_at(board, evt)
+    if cell is None:
+        return
+    board['last'] = cell
+    changed = minesweeper.play_move(board['game'], *cell, 'R')
+    if board['journal'] is not None:
+        jn.record(board['journal'], board['game'], *cell, 'R')
+    __redraw(board, changed)
+    __test_end(board)
+
+def __changeflag (board, evt):
+    """
+    This function is called on right-click on the canvas.
+    """
+    cell = __cell_at(board, evt)
+    if cell is None:
+        return
+    if not minesweeper.is_hypothetic_bomb(minesweeper.get_cell(board['game'],*cell)):
+        action = 'S'
+    else:
+        action = 'U'
+    minesweeper.play_move(board['game'], *cell, action)
+    if board['journal'] is not None:
+        jn.record(board['journal'], board['game'], *cell, action)
+    __redraw(board, [cell])
+
+def __chord (board, evt):
+    """
+    This function is called on middle-click on the canvas, to chord on
+    the cell under the mouse.
+    """
+    cell = __cell_at(board, evt)
+    if cell is None:
+        return
+    g = board['game']
+    changed = minesweeper.play_move(g, *cell, 'C')
+    if not changed:
+        return
+    if board['journal'] is not None:
+        jn.record(board['journal'], g, *cell, 'C')
+    # the bomb revealed by a wrong chord is the one drawn as explosed
+    for c in changed:
+        if minesweeper.is_bomb(minesweeper.get_cell(g,*c)):
+            cell = c
+    board['last'] = cell
+    __redraw(board, changed)
+    __test_end(board)
+
+def __undo (board, action, evt=None):
+    """
+    This function undoes the last move on Ctrl+Z (action ``'Z'``) and
+    redoes it on Ctrl+Y (action ``'Y'``), while the game is unfinished.
+    """
+    g = board['game']
+    if minesweeper.get_state(g) != minesweeper.GameState.unfinished:
+        return
+    if action == 'Z':
+        changed = minesweeper.undo_move(g)
+    else:
+        changed = minesweeper.redo_move(g)
+    if not changed:
+        return
+    if board['journal'] is not None:
+        jn.record(board['journal'], g, None, None, action)
+    __redraw(board, changed)
+    __test_end(board)
+
+def __test_end (board):
+    """
+    This function tests if the game is finished or not. In the first
+    case, the visible cells are redrawn and clicks are unbinded. A lost
+    board is also shaded.
+    """
+    state = minesweeper.get_state(board['game'])
+    if state == minesweeper.GameState.unfinished:
+        return
+    canvas = board['canvas']
+    __redraw(board)
+    canvas.unbind("<Button-1>")
+    canvas.unbind("<Button-3>")
+    canvas.unbind("<Button-2>")
+    if state == minesweeper.GameState.losing:
+        __shade(board)
+
+def __shade (board):
+    """
+    This function shades the whole board of a lost game.
+    """
+    canvas = board['canvas']
+    board['shade'] = canvas.create_rectangle(canvas.cget('scrollregion').split(),
+                                             fill='grey', stipple='gray50', width=0)
+
+
+if __name__ == "__main__":
+    pass
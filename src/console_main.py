@@ -1,7 +1,14 @@
 import minesweeper as ms
+import journal as jn
 import sys
 
-def launch(width, height, bombs):
+# the game whose lines are kept, its lines and the game last displayed
+# in ANSI mode
+__game = None
+__lines = []
+__shown = None
+
+def launch(width, height, bombs, ansi=False, journal_file=None):
     """
     launch the game
     :param width: width of the game
@@ -10,110 +17,178 @@ def launch(width, height, bombs):
     :type height: int
     :param bombs: number of bombs
     :type bombs: int
+    :param ansi: [optional] redraw only the changed rows of the board with
+                 ANSI escape sequences (default = False)
+    :type ansi: bool
+    :param journal_file: [optional] name of the file where the journal of
+                         the moves is saved when the game ends
+    :type journal_file: str
     """
-    game = ms.make_game(width, height, bombs)
+    game = ms.make_game(width, height, bombs, first_click_safe=True)
+    journal = jn.new_journal(game)
     state = ms.get_state(game)
+    changed = None
     while state == ms.GameState.unfinished:
         try:
-            display_game(game)
-            play(game)
+            display_game(game, ansi, changed)
+            changed = play(game, journal)
             state = ms.get_state(game)
         except KeyboardInterrupt:
+            if journal_file is not None:
+                jn.save_journal(journal, journal_file)
             sys.exit()
-    display_game(game)
+    if journal_file is not None:
+        jn.save_journal(journal, journal_file)
+    display_game(game, ansi, changed)
     if state == ms.GameState.losing:
         print("You lose!")
-    elif state == ms.GameState.unfinished:
+    elif state == ms.GameState.winning:
         print("You win!")
     else:
         print("an unexpected error has occured, please contact the developpers")
 
-def play(game):
+def play(game, journal=None):
     """
     require action to the player and execute it
     :param game: game
     :type game: a minesweeper game
-    :return: None
-    :rtype: NoneType
+    :param journal: [optional] the journal where the move is recorded
+    :type journal: dict
+    :return: the coordinates of the cells changed by the action
+    :rtype: list of tuple
     :UC: none
     """
     action = keyboard_input(game)
     x = action[0]
     y = action[1]
     a = action[2]
-    if a == 'R':
-        ms.reveal_all_cells_from(game,x, y)
-    elif a == 'S':
-        cell = ms.get_cell(game, x, y)
-        ms.set_hypothetic(cell)
-    elif a == 'U':
-        cell = ms.get_cell(game, x, y)
-        ms.unset_hypothetic(cell)
+    if journal is not None:
+        return jn.play(journal, game, x, y, a)
+    return jn.apply_move(game, x, y, a)
 
 def keyboard_input(game):
     """
     :param game: game
     :type game: a minesweeper game
-    :return: the player input action
+    :return: the player input action, x and y being ``None`` for Z (undo)
+             and Y (redo)
     :rtype: tuple of the action (posX, posY, action)
     :UC: none
     """
     try:
-        data_in = input("Your play x,y,C (C=(R)eval,(S)et,(U)nset): ")
+        data_in = input("Your play x,y,C (C=(R)eval,(S)et,(U)nset,(C)hord) or Z (undo), Y (redo): ")
+        if data_in.strip().upper() in ('Z', 'Y'):
+            return (None, None, data_in.strip().upper())
         ldata = data_in.split(',')
         x = int(ldata[0])
         y = int(ldata[1])
         c = ldata[2]
         assert x >= 0 and x < ms.get_height(game)
-        assert y >= 0 and x < ms.get_width(game)
+        assert y >= 0 and y < ms.get_width(game)
         c = c.upper()
-        assert c == 'R' or c == 'S' or c == 'U'
+        assert c == 'R' or c == 'S' or c == 'U' or c == 'C'
         return (x, y, c)
     except AssertionError:
         print("Numbers must be in range of the game")
-        keyboard_input(game)
+        return keyboard_input(game)
     except IndexError:
         print ('There must be two numbers and one letter separated by a comma (,)')
-        keyboard_input(game)
+        return keyboard_input(game)
     except TypeError:
         print ('There must be two numbers and one letter separated by a comma (,)')
-        keyboard_input(game)
+        return keyboard_input(game)
     except ValueError:
-        print ("x and y must be integers and c must be R or S or U")
-        keyboard_input(game)
+        print ("x and y must be integers and c must be R or S or U or C")
+        return keyboard_input(game)
+
+def render_row(game, h):
+    """
+    :param game: game
+    :type game: a minesweeper game
+    :param h: number of a row
+    :type h: int
+    :return: the line of text displaying the row h of the game
+    :rtype: str
+    :UC: 0 <= h < height of game
+    """
+    row = []
+    for l in range(ms.get_width(game)):
+        cell = ms.get_cell(game, h, l)
+        if ms.is_revealed(cell):
+            if ms.is_bomb(cell):
+                row.append("|  B")
+            else:
+                row.append("|  {}".format(ms.number_of_bombs_in_neighborhood(cell)))
+        elif ms.is_hypothetic_bomb(cell):
+            row.append("|  ?")
+        else:
+            row.append("|   ")
+    return "{} {}|".format(h, "".join(row))
+
+def render_game(game, cells=None):
+    """
+    The lines of the last rendered game are kept: when the cells changed
+    since its last rendering are given, only their rows are rendered
+    again.
 
-def display_game(game):
+    :param game: game
+    :type game: a minesweeper game
+    :param cells: [optional] the coordinates of the cells changed since
+                  the last call on game (default = render every row)
+    :type cells: list of tuple
+    :return: the lines of text displaying the game, row h being line 2*h+2
+    :rtype: list of str
+    :UC: none
     """
-    display the game in stdout
+    global __game, __lines
+    if cells is None or game is not __game:
+        width = ms.get_width(game)
+        display_line = "  " + "+---"*width + "+"
+        lines = [" " + "".join("   {}".format(i) for i in range(width))]
+        for h in range(ms.get_height(game)):
+            lines.append(display_line)
+            lines.append(render_row(game, h))
+        lines.append(display_line)
+        __game, __lines = game, lines
+    else:
+        for h in {x for x, _ in cells}:
+            __lines[2*h+2] = render_row(game, h)
+    return __lines
+
+def display_game(game, ansi=False, cells=None):
+    """
+    display the game in stdout. The whole frame is built first and
+    written at once.
+
+    In ANSI mode, the first frame is drawn at the top of the cleared
+    screen and the next ones only rewrite the rows of the given cells,
+    then clear what is below the board.
+
     :param game: game
     :type game: a minesweeper game
+    :param ansi: [optional] use ANSI escape sequences (default = False)
+    :type ansi: bool
+    :param cells: [optional] the coordinates of the cells changed since
+                  the game was last displayed (default = all of them)
+    :type cells: list of tuple
     :return: None
     :rType: NoneType
     :UC: none
     """
-    display_line = "+---"*ms.get_width(game) 
-    display_line += "+"
-    print(" ", end="")
-    for i in range(ms.get_width(game)-1):
-        print("  ", i, end="")
-    print("  ",ms.get_width(game)-1)
-    for h in range(ms.get_height(game)):
-        numerotation = ""
-        print(" ",display_line)
-        print(h ,"",end="")
-        for l in range(ms.get_width(game)):
-            character = " "
-            cell = ms.get_cell(game, h, l)
-            if ms.is_revealed(cell):
-                if ms.is_bomb(cell):
-                    character = "B"
-                else:
-                    character = ms.number_of_bombs_in_neighborhood(cell)
-            elif ms.is_hypothetic_bomb(cell):
-                    character = "?"
-            print("| ",character, end="")
-        print("|")
-    print(" ",display_line)
+    global __shown
+    incremental = ansi and cells is not None and game is __game and game is __shown
+    lines = render_game(game, cells)
+    if not ansi:
+        frame = "\n".join(lines) + "\n"
+    elif not incremental:
+        frame = "\x1b[2J\x1b[H" + "\n".join(lines) + "\n"
+    else:
+        frame = "".join("\x1b[{};1H{}\x1b[K".format(2*h+3, lines[2*h+2])
+                        for h in sorted({x for x, _ in cells}))
+        frame += "\x1b[{};1H\x1b[J".format(len(lines)+1)
+    __shown = game if ansi else None
+    sys.stdout.write(frame)
+    sys.stdout.flush()
             
 
 if __name__ == '__main__':
@@ -1,19 +1,34 @@
 import graphicalboard as graphic
+import canvasboard
 import minesweeper as ms
+import journal as jn
 import sys
 
-def launch(y,x,b):
+#: number of cells above which the game is drawn on a canvas
+CANVAS_THRESHOLD = 50*50
+
+def launch(y,x,b,journal_file=None):
     """
-    launch a minesweeper game with a graphical board
+    launch a minesweeper game with a graphical board. Large games are
+    drawn on a scrollable canvas instead of a grid of buttons.
     :param y: width of the game
     :type y: int
     :param x: height of the game
     :type x: int
     :param b: number of bombs
     :type b: int
+    :param journal_file: [optional] name of the file where the journal of
+                         the moves is saved when the window is closed
+    :type journal_file: str
     """
-    game = ms.make_game(y,x,b)
-    graphic.create(game)
+    game = ms.make_game(y,x,b,first_click_safe=True)
+    journal = jn.new_journal(game)
+    if x*y > CANVAS_THRESHOLD:
+        canvasboard.create(game, journal)
+    else:
+        graphic.create(game, journal)
+    if journal_file is not None:
+        jn.save_journal(journal, journal_file)
 
 if __name__ == '__main__':
     #assert len(sys.argv) == 4
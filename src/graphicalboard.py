@@ -33,14 +33,31 @@ To draw and run a minesweeper game, one has to:
 """
 
 import os
+import base64
 import minesweeper
+import journal as jn
 import tkinter as tk
+from collections import OrderedDict
 from functools import partial
 
 # the list of icons
 img = []
+# the journal where the moves are recorded, if any
+journal = None
 
-def create (g):
+#: side in pixels of an icon of the atlas
+ICON_SIZE = 19
+#: number of icon sets (one per Tk interpreter and zoom level) kept in cache
+CACHE_SIZE = 8
+
+# content of the icons atlas, read from disk once
+__atlas_data = None
+# atlas image of each Tk interpreter
+__atlases = {}
+# icon sets by (Tk interpreter, zoom), least recently used first
+__icons_cache = OrderedDict()
+
+def create (g, moves=None):
     """
     This function creates the graphical board from a game. It also
     launches the event loop. Thus, this is the only function to run to
@@ -48,31 +65,18 @@ def create (g):
 
     :param g: the minesweeper game
     :type g: game
+    :param moves: [optional] the journal where the moves are recorded
+    :type moves: dict
     :return: None
     """
-    global img
+    global img, journal
+    journal = moves
     # create a new Tk window
     win = tk.Tk()
     # define the window title
     win.title ('Minesweeper')
     # load images
-    iconpath = os.path.join(os.path.dirname(os.path.abspath(__file__)),"icons")
-    img = [
-        tk.PhotoImage(file=os.path.join(iconpath,"0.gif")),
-        tk.PhotoImage(file=os.path.join(iconpath,"1.gif")),
-        tk.PhotoImage(file=os.path.join(iconpath,"2.gif")),
-        tk.PhotoImage(file=os.path.join(iconpath,"3.gif")),
-        tk.PhotoImage(file=os.path.join(iconpath,"4.gif")),
-        tk.PhotoImage(file=os.path.join(iconpath,"5.gif")),
-        tk.PhotoImage(file=os.path.join(iconpath,"6.gif")),
-        tk.PhotoImage(file=os.path.join(iconpath,"7.gif")),
-        tk.PhotoImage(file=os.path.join(iconpath,"8.gif")),
-        tk.PhotoImage(file=os.path.join(iconpath,"9.gif")),  # unrevealed
-        tk.PhotoImage(file=os.path.join(iconpath,"10.gif")), # bomb explosed
-        tk.PhotoImage(file=os.path.join(iconpath,"11.gif")), # bomb discovered
-        tk.PhotoImage(file=os.path.join(iconpath,"12.gif")), # flag
-        tk.PhotoImage(file=os.path.join(iconpath,"13.gif"))  # question
-    ]
+    img = load_images(win)
     # create the graphical board made of Tk buttons
     width,height = (minesweeper.get_width(g),minesweeper.get_height(g))
     b = []
@@ -84,28 +88,92 @@ def create (g):
             b[i].insert(j,button)
             # bind the right-click event
             button.bind("<Button-3>",partial(__changeflag,b=b,g=g,i=j,j=i))
+            # bind the middle-click event
+            button.bind("<Button-2>",partial(__chord,b=b,g=g,i=j,j=i))
             # bind the left-click event
             button.config(command=partial(__changestate,b,g,j,i))
+    # bind Ctrl+Z and Ctrl+Y to undo and redo
+    win.bind("<Control-z>",partial(__undo,b=b,g=g,action='Z'))
+    win.bind("<Control-y>",partial(__undo,b=b,g=g,action='Y'))
 
     # event loop
     win.mainloop()
 
-def __test_end (b,g):
+def load_images (master, zoom=1):
+    """
+    This function returns the icons of the cells for the Tk window
+    master. The icons are sliced from a single atlas (``icons/atlas.png``,
+    the 14 icons side by side) read from disk only once. Sets of icons
+    are kept in a cache for each Tk interpreter and zoom level; the least
+    recently used ones are forgotten beyond :data:`CACHE_SIZE`.
+
+    :param master: a Tk widget
+    :type master: ``tk.Misc``
+    :param zoom: [optional] the integer zoom factor of icons (default = 1)
+    :type zoom: int
+    :return: the list of icons, indexed by:
+
+             * 0 to 8: revealed cell with that number of bombs around
+             * 9: unrevealed cell
+             * 10: bomb explosed
+             * 11: bomb discovered
+             * 12: flag
+             * 13: question
+    :rtype: list of ``PhotoImage``
+    :UC: zoom >= 1
+    """
+    global __atlas_data
+    interp = master.tk
+    key = (interp, zoom)
+    icons = __icons_cache.get(key)
+    if icons is not None:
+        __icons_cache.move_to_end(key)
+        return icons
+    atlas = __atlases.get(interp)
+    if atlas is None:
+        if __atlas_data is None:
+            atlaspath = os.path.join(os.path.dirname(os.path.abspath(__file__)),"icons","atlas.png")
+            with open(atlaspath, 'rb') as f:
+                __atlas_data = base64.b64encode(f.read())
+        atlas = tk.PhotoImage(master=master, data=__atlas_data)
+        __atlases[interp] = atlas
+    size = ICON_SIZE*zoom
+    icons = []
+    for i in range(14):
+        icon = tk.PhotoImage(master=master, width=size, height=size)
+        icon.tk.call(icon, 'copy', atlas, '-from', i*ICON_SIZE, 0, (i+1)*ICON_SIZE,
+                     ICON_SIZE, '-zoom', zoom)
+        icons.append(icon)
+    __icons_cache[key] = icons
+    while len(__icons_cache) > CACHE_SIZE:
+        (old, _), _ = __icons_cache.popitem(last=False)
+        if all(k[0] is not old for k in __icons_cache):
+            del __atlases[old]
+    return icons
+
+def __test_end (b,g,x,y):
     """
     This function tests if the game is finished or not.  In the first
-    case, depending on the state of the game, all graphical cells are
-    diabled or events are unbinded.
+    case, the whole board is redrawn and, depending on the state of the
+    game, all graphical cells are diabled or events are unbinded.
 
     :param b: the board of buttons
     :type b: list of list of ``button``
     :param g: the minesweeper game
     :type g: game
+    :param x: the x-coordinate of the last played cell
+    :type x: int
+    :param y: the y-coordinate of the last played cell
+    :type y: int
 
     """
     state = minesweeper.get_state(g)
+    if state == minesweeper.GameState.unfinished:
+        return
+    __redraw(b,g,x,y)
     if state == minesweeper.GameState.losing:
         __disable_game (b,g)
-    elif state == minesweeper.GameState.winning:
+    else:
         __block_game(b,g)
     
 def __changestate (b,g,i,j):
@@ -121,9 +189,11 @@ def __changestate (b,g,i,j):
     :param j: the y-coordinate of the cell
     :type j: int
     """
-    minesweeper.reveal_all_cells_from(g,i,j)
-    __redraw(b,g,i,j)
-    __test_end (b,g)
+    changed = minesweeper.play_move(g,i,j,'R')
+    if journal is not None:
+        jn.record(journal,g,i,j,'R')
+    __redraw(b,g,i,j,changed)
+    __test_end (b,g,i,j)
 
 def __changeflag (evt,b,g,i,j):
     """
@@ -138,13 +208,69 @@ def __changeflag (evt,b,g,i,j):
     :param j: the y-coordinate of the cell
     :type j: int
     """
-    cell = minesweeper.get_cell(g,i,j)
-    if not minesweeper.is_hypothetic_bomb(cell):
-        minesweeper.set_hypothetic(cell)
+    if not minesweeper.is_hypothetic_bomb(minesweeper.get_cell(g,i,j)):
+        action = 'S'
+    else:
+        action = 'U'
+    minesweeper.play_move(g,i,j,action)
+    if journal is not None:
+        jn.record(journal,g,i,j,action)
+    __redraw(b,g,i,j,[(i,j)])
+    __test_end (b,g,i,j)
+
+def __chord (evt,b,g,i,j):
+    """
+    This function is called on middle-click on a button. It reveals the
+    unflagged neighbors of a revealed cell having as many flags as bombs
+    around it.
+
+    :param b: the board of buttons
+    :type b: list of list of ``button``
+    :param g: the minesweeper game
+    :type g: game
+    :param i: the x-coordinate of the cell
+    :type i: int
+    :param j: the y-coordinate of the cell
+    :type j: int
+    """
+    changed = minesweeper.play_move(g,i,j,'C')
+    if not changed:
+        return
+    if journal is not None:
+        jn.record(journal,g,i,j,'C')
+    # the bomb revealed by a wrong chord is the one drawn as explosed
+    for x,y in changed:
+        if minesweeper.is_bomb(minesweeper.get_cell(g,x,y)):
+            i,j = x,y
+    __redraw(b,g,i,j,changed)
+    __test_end (b,g,i,j)
+
+def __undo (evt,b,g,action):
+    """
+    This function is called on Ctrl+Z (action ``'Z'``) to undo the last
+    move and on Ctrl+Y (action ``'Y'``) to redo it. Only the buttons of
+    the cells changed back are redrawn. Finished games are left as is.
+
+    :param b: the board of buttons
+    :type b: list of list of ``button``
+    :param g: the minesweeper game
+    :type g: game
+    :param action: ``'Z'`` or ``'Y'``
+    :type action: str
+    """
+    if minesweeper.get_state(g) != minesweeper.GameState.unfinished:
+        return
+    if action == 'Z':
+        changed = minesweeper.undo_move(g)
     else:
-        minesweeper.unset_hypothetic(cell)
-    __redraw(b,g,i,j)
-    __test_end (b,g)
+        changed = minesweeper.redo_move(g)
+    if not changed:
+        return
+    if journal is not None:
+        jn.record(journal,g,None,None,action)
+    x,y = changed[0]
+    __redraw(b,g,x,y,changed)
+    __test_end (b,g,x,y)
     
         
 def __block_game (b,g):
@@ -163,7 +289,8 @@ def __block_game (b,g):
         for j in range(height):
             button = b[i][j]
             button.config(command="")
-            button.bind("<Button-3>","")       
+            button.bind("<Button-3>","")
+            button.bind("<Button-2>","")
             
 def __disable_game (b,g):
     """
@@ -181,13 +308,15 @@ def __disable_game (b,g):
         for j in range(height):
             button = b[i][j]
             button.config(state=tk.DISABLED)
-            button.bind("<Button-3>","")       
+            button.bind("<Button-3>","")
+            button.bind("<Button-2>","")
 
             
-def __redraw (b,g,x,y):
+def __redraw (b,g,x,y,cells=None):
     """
     This function draws the board. Positions x and y are used to test
-    which bomb icon has to be drawn.
+    which bomb icon has to be drawn. Only the buttons of the given
+    cells are reconfigured, or all of them if cells is ``None``.
 
     :param b: the board of buttons
     :type b: list of list of ``button``
@@ -197,26 +326,31 @@ def __redraw (b,g,x,y):
     :type x: int
     :param y: the y-coordinate of the cell
     :type y: int
+    :param cells: [optional] the coordinates of the cells which changed
+    :type cells: list of tuple
 
     """
     global img
-    width,height = (minesweeper.get_width(g),minesweeper.get_height(g))
-    for i in range(width):
-        for j in range(height):
-            cell = minesweeper.get_cell(g,j,i)
-            button = b[i][j]
-            if minesweeper.is_revealed(cell):
-                if minesweeper.is_bomb(cell):
-                    new_img = img[10]
-                    if x == j and y == i:
-                        new_img = img[11]
-                else:
-                    new_img = img[minesweeper.number_of_bombs_in_neighborhood(cell)]
-                button.config(relief=tk.FLAT,image=new_img, command = "")
-            elif minesweeper.is_hypothetic_bomb(cell):
-                button.config(image=img[12])
+    if cells is None:
+        width,height = (minesweeper.get_width(g),minesweeper.get_height(g))
+        cells = ((j,i) for i in range(width) for j in range(height))
+    for j,i in cells:
+        cell = minesweeper.get_cell(g,j,i)
+        button = b[i][j]
+        if minesweeper.is_revealed(cell):
+            if minesweeper.is_bomb(cell):
+                new_img = img[10]
+                if x == j and y == i:
+                    new_img = img[11]
             else:
-                button.config(image=img[9])
+                new_img = img[minesweeper.number_of_bombs_in_neighborhood(cell)]
+            button.config(relief=tk.FLAT,image=new_img, command = "")
+        elif minesweeper.is_hypothetic_bomb(cell):
+            button.config(relief=tk.RAISED,image=img[12],
+                          command=partial(__changestate,b,g,j,i))
+        else:
+            button.config(relief=tk.RAISED,image=img[9],
+                          command=partial(__changestate,b,g,j,i))
 
     
 
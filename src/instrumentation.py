@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`instrumentation` module
+
+This module measures the calls of the public functions of
+:mod:`minesweeper`: number of calls, cumulative time, latency
+percentiles and, for :func:`minesweeper.reveal_all_cells_from`, the
+number of cells revealed by a call.
+
+Instrumentation is opt-in. :func:`enable` replaces the functions of the
+:mod:`minesweeper` module by measuring wrappers, and :func:`disable`
+puts the original functions back: when it is off, nothing is left on
+the call path. Since the other modules call ``minesweeper.f``, they are
+measured without any change.
+
+Typical use::
+
+    import instrumentation
+    instrumentation.enable()
+    ...  # play
+    instrumentation.disable()
+    print(instrumentation.snapshot())
+"""
+
+import json
+import time
+import random
+import minesweeper
+
+#: maximal number of latencies kept per function, a uniform sample of
+#: all of them is kept beyond
+MAX_SAMPLES = 100000
+
+# the original functions, by name, while instrumentation is enabled
+__originals = {}
+# the measures, by function name
+__stats = {}
+# the generator of the reservoir sampling, apart from the global one
+# which draws the seeds of the games
+__rng = random.Random()
+
+
+def __new_stats ():
+    return {'calls' : 0, 'total' : 0.0, 'max' : 0.0, 'samples' : [],
+            'cells' : 0, 'cells_max' : 0}
+
+def __record (stats, duration):
+    """
+    add a call of the given duration to stats, keeping a uniform sample
+    of at most :data:`MAX_SAMPLES` latencies (reservoir sampling).
+    """
+    stats['calls'] += 1
+    stats['total'] += duration
+    if duration > stats['max']:
+        stats['max'] = duration
+    samples = stats['samples']
+    if len(samples) < MAX_SAMPLES:
+        samples.append(duration)
+    else:
+        k = __rng.randrange(stats['calls'])
+        if k < MAX_SAMPLES:
+            samples[k] = duration
+
+def __wrap (name, function):
+    """
+    :return: a function measuring the calls of function in __stats[name]
+    :rtype: function
+    """
+    stats = __stats.setdefault(name, __new_stats())
+    clock = time.perf_counter
+    record = __record
+
+    if name == 'reveal_all_cells_from':
+        def wrapper (*args, **kwargs):
+            start = clock()
+            result = function(*args, **kwargs)
+            record(stats, clock() - start)
+            stats['cells'] += len(result)
+            if len(result) > stats['cells_max']:
+                stats['cells_max'] = len(result)
+            return result
+    else:
+        def wrapper (*args, **kwargs):
+            start = clock()
+            result = function(*args, **kwargs)
+            record(stats, clock() - start)
+            return result
+    wrapper.__name__ = function.__name__
+    wrapper.__doc__ = function.__doc__
+    wrapper.__wrapped__ = function
+    return wrapper
+
+def public_functions ():
+    """
+    :return: the names of the public functions of :mod:`minesweeper`
+    :rtype: list of str
+    """
+    return sorted(name for name, value in vars(minesweeper).items()
+                  if callable(value) and not isinstance(value, type)
+                  and not name.startswith('_')
+                  and getattr(value, '__module__', None) == 'minesweeper')
+
+def is_enabled ():
+    """
+    :return: ``True`` if the instrumentation is enabled
+    :rtype: bool
+    """
+    return bool(__originals)
+
+def enable (names=None):
+    """
+    instrument the functions of :mod:`minesweeper`.
+
+    :param names: [optional] the names of the functions to instrument
+                  (default = all the public functions)
+    :type names: list of str
+    :return: None
+    :rtype: NoneType
+    :Side effect: replace the functions in the :mod:`minesweeper` module
+    :UC: the instrumentation is disabled
+    """
+    assert not is_enabled(), 'instrumentation is already enabled'
+    if names is None:
+        names = public_functions()
+    for name in names:
+        function = getattr(minesweeper, name)
+        __originals[name] = function
+        setattr(minesweeper, name, __wrap(name, function))
+
+def disable ():
+    """
+    put the original functions back in :mod:`minesweeper`. The measures
+    are kept.
+
+    :return: None
+    :rtype: NoneType
+    """
+    for name, function in __originals.items():
+        setattr(minesweeper, name, function)
+    __originals.clear()
+
+def reset ():
+    """
+    forget the measures.
+
+    :return: None
+    :rtype: NoneType
+    """
+    for stats in __stats.values():
+        stats.update(__new_stats())
+
+def __percentile (values, p):
+    return values[max(0, -(-len(values) * p // 100) - 1)] if values else 0.0
+
+def snapshot ():
+    """
+    :return: the measures of the called functions: for each name, the
+             number of calls, the cumulative, mean and maximal times and
+             the median, 90th and 99th percentiles of the latencies, in
+             seconds, plus the total, mean and maximal numbers of cells
+             revealed for :func:`minesweeper.reveal_all_cells_from`
+    :rtype: dict
+    """
+    result = {}
+    for name, stats in sorted(__stats.items()):
+        if not stats['calls']:
+            continue
+        samples = sorted(stats['samples'])
+        result[name] = {'calls' : stats['calls'],
+                        'total' : stats['total'],
+                        'mean' : stats['total'] / stats['calls'],
+                        'p50' : __percentile(samples, 50),
+                        'p90' : __percentile(samples, 90),
+                        'p99' : __percentile(samples, 99),
+                        'max' : stats['max']}
+        if name == 'reveal_all_cells_from':
+            result[name]['cells'] = stats['cells']
+            result[name]['cells_mean'] = stats['cells'] / stats['calls']
+            result[name]['cells_max'] = stats['cells_max']
+    return result
+
+def dump (filename):
+    """
+    write the :func:`snapshot` of the measures in a JSON file.
+
+    :param filename: name of the file
+    :type filename: str
+    :return: None
+    :rtype: NoneType
+    """
+    with open(filename, 'w') as f:
+        json.dump(snapshot(), f, indent=1)
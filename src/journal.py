@@ -0,0 +1,302 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`journal` module
+
+This module records the moves played on a minesweeper game, to replay
+player sessions and bot runs.
+
+A journal is append-only. Each move is a single unsigned varint
+(LEB128) ``index << 2 | action``, where ``index`` is the index
+``x*width+y`` of the played cell and ``action`` is 0 to reveal, 1 to
+set a flag and 2 to unset it: a move of a 30x16 game takes at most 2
+bytes. Action 3 stands for :func:`minesweeper.undo_move` when
+``index`` is 0, for :func:`minesweeper.redo_move` when it is 1, and for
+a chord on the cell of index ``index - 2`` otherwise.
+
+Every ``interval`` moves, the journal keeps a snapshot of the game (a
+copy of its grid and counters) with the position of the next move.
+:func:`replay` restores the nearest snapshot before the wanted move and
+only replays the moves after it. Snapshots are not saved in files:
+they are built again, from the seed, while replaying a loaded journal.
+
+This module uses from :mod:`minesweeper`:
+
+* :func:`minesweeper.make_game`
+* :func:`minesweeper.play_move`
+* :func:`minesweeper.undo_move`
+* :func:`minesweeper.redo_move`
+"""
+
+import struct
+import bisect
+import minesweeper as ms
+
+#: the code of each action in a move
+ACTIONS = {'R' : 0, 'S' : 1, 'U' : 2, 'C' : 3, 'Z' : 3, 'Y' : 3}
+__LETTERS = 'RSU'
+__HISTORY = 'ZY'
+
+# magic, version, width, height, nbombs, seed, first_click_safe,
+# topology (index in minesweeper.TOPOLOGIES), interval
+__HEADER = struct.Struct('<4sB3xQQQQ?B2xI')
+__MAGIC = b'MSWJ'
+__VERSION = 1
+
+
+def encode_varint (n, out):
+    """
+    append the LEB128 encoding of n to out.
+
+    :param n: a number
+    :type n: int
+    :param out: the buffer
+    :type out: bytearray
+    :return: None
+    :rtype: NoneType
+    :UC: n >= 0
+    """
+    while n > 0x7F:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+def decode_varint (data, pos):
+    """
+    :param data: a buffer
+    :type data: bytes
+    :param pos: position of a varint in data
+    :type pos: int
+    :return: the number encoded at pos and the position after it
+    :rtype: tuple (int, int)
+    """
+    n = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+def __snapshot (game):
+    return (bytes(game['grid']), game['nrevealed'], game['exploded'],
+            game.get('first_click_safe', False),
+            tuple(game.get('undo', ())), tuple(game.get('redo', ())))
+
+def new_journal (game, interval=64):
+    """
+    :param game: a fresh minesweeper game, made by :func:`minesweeper.make_game`
+    :type game: game
+    :param interval: [optional] number of moves between two snapshots
+                     (default = 64)
+    :type interval: int
+    :return: a new empty journal of game
+    :rtype: dict
+    :UC: 0 < interval and game is not sparse, its snapshots copying its grid
+    """
+    assert not isinstance(game['grid'], ms.SparseGrid), 'a journal needs a game which is not sparse'
+    return {'width' : ms.get_width(game),
+            'height' : ms.get_height(game),
+            'nbombs' : game['nbombs'],
+            'seed' : game['seed'],
+            'first_click_safe' : game.get('first_click_safe', False),
+            'topology' : game.get('topology', 'square'),
+            'interval' : interval,
+            'moves' : bytearray(),
+            'count' : 0,
+            'snapshots' : [0],
+            'states' : {0 : (0, __snapshot(game))}}
+
+def record (journal, game, x, y, action):
+    """
+    append a move, already played on game, to the journal.
+
+    :param journal: the journal of game
+    :type journal: dict
+    :param game: a minesweeper game
+    :type game: game
+    :param x: x-coordinate of the played cell
+    :type x: int
+    :param y: y-coordinate of the played cell
+    :type y: int
+    :param action: ``'R'``, ``'S'``, ``'U'``, ``'C'``, or ``'Z'`` (undo)
+                   and ``'Y'`` (redo) for which x and y are ignored
+    :type action: str
+    :return: None
+    :rtype: NoneType
+    """
+    if action in __HISTORY:
+        index = __HISTORY.index(action)
+    elif action == 'C':
+        index = x*journal['width'] + y + len(__HISTORY)
+    else:
+        index = x*journal['width'] + y
+    encode_varint(index << 2 | ACTIONS[action], journal['moves'])
+    journal['count'] += 1
+    k = journal['count']
+    if k % journal['interval'] == 0:
+        __keep(journal, k, len(journal['moves']), game)
+
+def __keep (journal, k, pos, game):
+    """
+    keep the snapshot of game after k moves, the next one being at pos.
+    """
+    if k not in journal['states']:
+        bisect.insort(journal['snapshots'], k)
+        journal['states'][k] = (pos, __snapshot(game))
+
+def apply_move (game, x, y, action):
+    """
+    play a move on game.
+
+    :return: the cells changed by the move
+    :rtype: list of tuple
+    """
+    if action == 'Z':
+        return ms.undo_move(game)
+    if action == 'Y':
+        return ms.redo_move(game)
+    return ms.play_move(game, x, y, action)
+
+def play (journal, game, x, y, action):
+    """
+    play a move on game and append it to the journal.
+
+    :return: the cells changed by the move
+    :rtype: list of tuple
+    """
+    changed = apply_move(game, x, y, action)
+    record(journal, game, x, y, action)
+    return changed
+
+def moves (journal):
+    """
+    :return: the moves of the journal, in order; x and y are ``None``
+             for undo and redo
+    :rtype: generator of tuple (x, y, action)
+    """
+    data = journal['moves']
+    width = journal['width']
+    pos = 0
+    while pos < len(data):
+        move, pos = decode_varint(data, pos)
+        yield __decode(move, width)
+
+def __decode (move, width):
+    """
+    :return: the move encoded by the number move
+    :rtype: tuple (x, y, action)
+    """
+    index = move >> 2
+    if move & 3 != 3:
+        x, y = divmod(index, width)
+        return (x, y, __LETTERS[move & 3])
+    if index < len(__HISTORY):
+        return (None, None, __HISTORY[index])
+    x, y = divmod(index - len(__HISTORY), width)
+    return (x, y, 'C')
+
+def replay (journal, k=None):
+    """
+    :param journal: a journal
+    :type journal: dict
+    :param k: [optional] a number of moves (default = all the moves)
+    :type k: int
+    :return: a new game in the state reached after the first k moves of
+             the journal, rebuilt from the nearest snapshot
+    :rtype: game
+    :UC: 0 <= k <= number of moves of the journal
+
+    >>> game = ms.make_game(9, 9, 10, seed=1)
+    >>> journal = new_journal(game, interval=2)
+    >>> states = [bytes(game['grid'])]
+    >>> for x, y, action in [(4, 4, 'R'), (8, 8, 'S'), (8, 8, 'U'), (0, 0, 'Z'), (0, 0, 'Y')]:
+    ...     _ = play(journal, game, x, y, action)
+    ...     states.append(bytes(game['grid']))
+    >>> all(bytes(replay(journal, k)['grid']) == states[k] for k in range(6))
+    True
+    """
+    if k is None:
+        k = journal['count']
+    start = journal['snapshots'][bisect.bisect_right(journal['snapshots'], k) - 1]
+    pos, (grid, nrevealed, exploded, first_click_safe, undo, redo) = journal['states'][start]
+    width = journal['width']
+    game = {'width' : width,
+            'height' : journal['height'],
+            'nbombs' : journal['nbombs'],
+            'seed' : journal['seed'],
+            'grid' : bytearray(grid),
+            'bombs' : None,
+            'nsafe' : width*journal['height'] - journal['nbombs'],
+            'nrevealed' : nrevealed,
+            'exploded' : exploded,
+            'first_click_safe' : first_click_safe,
+            'topology' : journal['topology'],
+            'undo' : list(undo),
+            'redo' : list(redo)}
+    data = journal['moves']
+    interval = journal['interval']
+    for i in range(start, k):
+        move, pos = decode_varint(data, pos)
+        apply_move(game, *__decode(move, width))
+        if (i+1) % interval == 0:
+            __keep(journal, i+1, pos, game)
+    return game
+
+def save_journal (journal, filename):
+    """
+    write the journal in a file: a header with the size, number of
+    bombs and seed of the game, then the moves.
+
+    :param journal: a journal
+    :type journal: dict
+    :param filename: name of the file
+    :type filename: str
+    :return: None
+    :rtype: NoneType
+    """
+    with open(filename, 'wb') as f:
+        f.write(__HEADER.pack(__MAGIC, __VERSION, journal['width'], journal['height'],
+                              journal['nbombs'], journal['seed'],
+                              journal['first_click_safe'],
+                              ms.TOPOLOGIES.index(journal['topology']), journal['interval']))
+        f.write(journal['moves'])
+
+def load_journal (filename):
+    """
+    read a journal written by :func:`save_journal`. Its game is generated
+    again from the seed.
+
+    :param filename: name of the file
+    :type filename: str
+    :return: the journal
+    :rtype: dict
+    :UC: the game of the journal was made by :func:`minesweeper.make_game`
+         without numpy
+
+    >>> import os, tempfile
+    >>> game = ms.make_game(30, 16, 99, seed=2)
+    >>> journal = new_journal(game)
+    >>> for x, y, action in [(15, 8, 'R'), (0, 29, 'S'), (1, 2, 'C'), (0, 0, 'Z')]:
+    ...     _ = play(journal, game, x, y, action)
+    >>> filename = os.path.join(tempfile.mkdtemp(), 'game.msj')
+    >>> save_journal(journal, filename)
+    >>> loaded = load_journal(filename)
+    >>> list(moves(loaded)) == list(moves(journal))
+    True
+    >>> bytes(replay(loaded)['grid']) == game['grid']
+    True
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+    magic, version, width, height, nbombs, seed, first_click_safe, topology, interval = \
+        __HEADER.unpack_from(data)
+    assert magic == __MAGIC and version == __VERSION, 'not a journal'
+    game = ms.make_game(width, height, nbombs, seed=seed, first_click_safe=first_click_safe,
+                        topology=ms.TOPOLOGIES[topology])
+    journal = new_journal(game, interval)
+    journal['moves'] = bytearray(data[__HEADER.size:])
+    journal['count'] = sum(1 for b in journal['moves'] if b < 0x80)
+    return journal
@@ -0,0 +1,163 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`loadgen` module
+
+This module is a load generator for :mod:`server`: it opens one
+connection per game, plays all the games at the same time by revealing
+random hidden cells, and reports the throughput of the server and the
+latencies of the moves.
+
+Unless the port of a running server is given, a server is started in
+the same process on a free port, so a run only needs this module.
+
+From the command line::
+
+    python3 loadgen.py ngames width height nbombs [port]
+"""
+
+import sys
+import time
+import random
+import asyncio
+import server
+from simulation import percentile
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def __raise_file_limit (n):
+    """
+    raise the limit of open files of the process to n, when the system
+    allows it, so that thousands of connections can be opened.
+    """
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < n:
+        if hard != resource.RLIM_INFINITY:
+            n = min(n, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (n, hard))
+
+async def play (host, port, width, height, nbombs, seed, max_moves=None):
+    """
+    play a game on the server, revealing hidden cells in a random order
+    until the game is finished.
+
+    :param host: address of the server
+    :type host: str
+    :param port: port of the server
+    :type port: int
+    :param width: width of the game
+    :type width: int
+    :param height: height of the game
+    :type height: int
+    :param nbombs: number of bombs
+    :type nbombs: int
+    :param seed: seed of the order of the moves
+    :type seed: int
+    :param max_moves: [optional] number of moves after which the game is
+                      abandoned (default = no limit)
+    :type max_moves: int
+    :return: the final state (``'U'``, ``'W'`` or ``'L'``) and the
+             latency in seconds of each move
+    :rtype: tuple (str, list of float)
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write('N {},{},{}\n'.format(width, height, nbombs).encode('ascii'))
+    await reader.readline()
+    cells = [(x, y) for x in range(height) for y in range(width)]
+    random.Random(seed).shuffle(cells)
+    shown = set()
+    latencies = []
+    state = 'U'
+    clock = time.perf_counter
+    for x, y in cells:
+        if state != 'U' or len(latencies) == max_moves:
+            break
+        if (x, y) in shown:
+            continue
+        start = clock()
+        writer.write('{},{},R\n'.format(x, y).encode('ascii'))
+        reply = (await reader.readline()).decode('ascii').split()
+        latencies.append(clock() - start)
+        state = reply[0]
+        for change in reply[1:]:
+            x1, y1, _ = change.split(',')
+            shown.add((int(x1), int(y1)))
+    writer.write(b'Q\n')
+    writer.close()
+    return state, latencies
+
+async def run (ngames, width, height, nbombs, host='127.0.0.1', port=None,
+               seed=0, max_moves=None):
+    """
+    play ngames games at the same time on a server.
+
+    :param ngames: number of games
+    :type ngames: int
+    :param width: width of the games
+    :type width: int
+    :param height: height of the games
+    :type height: int
+    :param nbombs: number of bombs of the games
+    :type nbombs: int
+    :param host: [optional] address of the server (default = localhost)
+    :type host: str
+    :param port: [optional] port of the server; a server is started in
+                 this process if None (default = None)
+    :type port: int
+    :param seed: [optional] seed of the run, game i is played with
+                 seed ``seed + i`` (default = 0)
+    :type seed: int
+    :param max_moves: [optional] maximal number of moves of a game
+    :type max_moves: int
+    :return: a dict with the number of games, of wins, of moves, the
+             throughput in moves per second, the mean, median, 99th
+             percentile and maximal latencies of a move in seconds, and
+             the wall-clock duration of the run
+    :rtype: dict
+    :UC: 0 < ngames
+    """
+    __raise_file_limit(2*ngames + 64)
+    local = None
+    if port is None:
+        local = await server.start(host, 0)
+        port = local.sockets[0].getsockname()[1]
+    try:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(play(host, port, width, height, nbombs,
+                                              seed + i, max_moves)
+                                         for i in range(ngames)))
+        duration = time.perf_counter() - start
+    finally:
+        if local is not None:
+            local.close()
+            await local.wait_closed()
+    latencies = sorted(l for _, moves in results for l in moves)
+    return {'games' : ngames,
+            'wins' : sum(1 for state, _ in results if state == 'W'),
+            'moves' : len(latencies),
+            'throughput' : len(latencies) / duration,
+            'latency_mean' : sum(latencies) / max(1, len(latencies)),
+            'latency_p50' : percentile(latencies, 50) if latencies else 0.0,
+            'latency_p99' : percentile(latencies, 99) if latencies else 0.0,
+            'latency_max' : latencies[-1] if latencies else 0.0,
+            'duration' : duration}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) in (5, 6):
+        try:
+            n, w, h, b = (int(arg) for arg in sys.argv[1:5])
+            port = int(sys.argv[5]) if len(sys.argv) == 6 else None
+            for key, value in asyncio.run(run(n, w, h, b, port=port)).items():
+                print("{}: {}".format(key, value))
+        except ValueError:
+            print("arguments must be integers")
+    else:
+        print("usage: loadgen.py ngames width height nbombs [port]")
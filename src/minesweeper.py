@@ -2,11 +2,41 @@
 # -*- coding: utf-8 -*-
 
 """
-DOCUMENTATION A FOURNIR
+:mod:`minesweeper` module
+
+This module implements the minesweeper's engine: the grid, its cells
+and the game.
+
+A grid is stored in a compact way, as a single ``bytearray`` holding
+one byte per cell (see :data:`CELL_SIZE`). Cell (x,y) of a grid of
+width ``width`` is the byte at index ``x*width+y``, where
+
+* bits 0 to 3 hold the number of bombs in the neighborhood,
+* bit 4 (:data:`CELL_BOMB`) is set when the cell contains a bomb,
+* bit 5 (:data:`CELL_REVEALED`) is set when the cell is revealed,
+* bit 6 (:data:`CELL_HYPOTHETIC`) is set when the cell is flagged.
+
+Thus a 2000x2000 grid takes 4 MB. A cell, as returned by
+:func:`get_cell`, is only a light handle ``(game, index)`` on that
+byte: it is read and modified with :func:`is_bomb`,
+:func:`is_revealed`, :func:`reveal`, :func:`set_hypothetic`, etc.
 """
 
+import sys
+import mmap
+import time
+import bisect
 import random
+import struct
+import threading
+from array import array
 from enum import Enum
+from collections import OrderedDict, deque
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 ################################################
@@ -30,22 +60,26 @@ class GameState (Enum):
 
 
 ################################################
-# Functions for cell's management
+# Cell encoding
 ################################################
-def __make_cell ():
-    """
-    :return: a new hidden cell of a minesweeper's grid. 
-             existence of a bomb, number of bombs in neigh_borhood 
-             have to be stated later.
-    :rtype: cell
-    :UC: none
-    """
-    return {'bomb' : False,
-            'hypothetic_bomb' : False,
-            'nbombs_neighborhood' : 0,
-            'hidden' : True}
+
+#: bits 0-3 of a cell: number of bombs in the neighborhood (0..8)
+CELL_COUNT = 0x0F
+#: bit 4 of a cell: the cell contains a bomb
+CELL_BOMB = 0x10
+#: bit 5 of a cell: the cell is revealed
+CELL_REVEALED = 0x20
+#: bit 6 of a cell: the cell is marked as a hypothetic bomb
+CELL_HYPOTHETIC = 0x40
+
+#: memory used by one cell of a grid, in bytes
+CELL_SIZE = 1
 
 
+################################################
+# Functions for cell's management
+################################################
+
 def is_bomb (cell):
     """
     :param cell: a cell of a minesweeper's grid
@@ -56,7 +90,8 @@ def is_bomb (cell):
     :rtype: bool
     :UC: none
     """
-    return cell['bomb']
+    game, i = cell
+    return game['grid'][i] & CELL_BOMB != 0
 
 def is_hypothetic_bomb (cell):
     """
@@ -68,7 +103,8 @@ def is_hypothetic_bomb (cell):
     :rtype: bool
     :UC: none
     """
-    return cell['hypothetic_bomb']
+    game, i = cell
+    return game['grid'][i] & CELL_HYPOTHETIC != 0
 
 def is_revealed (cell):
     """
@@ -80,7 +116,8 @@ def is_revealed (cell):
     :rtype: bool
     :UC: none
     """
-    return not cell['hidden']
+    game, i = cell
+    return game['grid'][i] & CELL_REVEALED != 0
 
 def number_of_bombs_in_neighborhood (cell):
     """
@@ -90,7 +127,8 @@ def number_of_bombs_in_neighborhood (cell):
     :rtype: int
     :UC: none
     """
-    return cell['nbombs_neighborhood']
+    game, i = cell
+    return game['grid'][i] & CELL_COUNT
 
 def reveal(cell):
     """
@@ -98,10 +136,20 @@ def reveal(cell):
     :type cell: cell
     :return: None 
     :rtype: NoneType
-    :Side effect: set the state of cell cell as revealed
+    :Side effect: set the state of cell cell as revealed and update
+                  the counters used by :func:`get_state`
     :UC: none
     """
-    cell['hidden'] = False
+    game, i = cell
+    grid = game['grid']
+    c = grid[i]
+    if c & CELL_REVEALED:
+        return
+    grid[i] = c | CELL_REVEALED
+    if c & CELL_BOMB:
+        game['exploded'] = True
+    else:
+        game['nrevealed'] += 1
 
 def set_hypothetic (cell):
     """
@@ -109,11 +157,16 @@ def set_hypothetic (cell):
     :type cell: cell
     :return: None 
     :rtype: NoneType
-    :Side effect: mark the cell as containing a (hypothetic) bomb
+    :Side effect: mark the cell as containing a (hypothetic) bomb and
+                  update the numbers of flags around its neighbors
     :UC: none    
     """
-    if not is_revealed (cell):
-        cell['hypothetic_bomb'] = True
+    game, i = cell
+    grid = game['grid']
+    c = grid[i]
+    if not c & (CELL_REVEALED | CELL_HYPOTHETIC):
+        grid[i] = c | CELL_HYPOTHETIC
+        __count_flag(game, i, 1)
 
 def unset_hypothetic (cell):
     """
@@ -121,16 +174,37 @@ def unset_hypothetic (cell):
     :type cell: cell
     :return: None 
     :rtype: NoneType
-    :Side effect: unmark the cell as containing a (hypothetic) bomb
+    :Side effect: unmark the cell as containing a (hypothetic) bomb and
+                  update the numbers of flags around its neighbors
     :UC: none    
     """
-    if not is_revealed (cell):
-        cell['hypothetic_bomb'] = False
+    game, i = cell
+    grid = game['grid']
+    c = grid[i]
+    if c & CELL_HYPOTHETIC and not c & CELL_REVEALED:
+        grid[i] = c & ~CELL_HYPOTHETIC
+        __count_flag(game, i, -1)
+
+def __count_flag (game, i, step):
+    """
+    add step to the number of flags around each neighbor of the cell of
+    index i, when the game keeps these numbers (see :func:`chord`).
+    """
+    counts = game.get('flagged')
+    if counts is None:
+        return
+    for j in __around(game)(i):
+        n = counts.get(j, 0) + step
+        if n:
+            counts[j] = n
+        else:
+            del counts[j]
 
-def neighborhood(x,y,height,width):
+def neighborhood(x,y,height,width,topology='square'):
     """
     return the list of coordinates of the neighbors de cell (x,y) in a
-    grid of size width*height
+    grid of size width*height, read in the adjacency table of the grid
+    (see :func:`adjacency`)
 
     :param x: x-coordinate of a cell
     :type x: int
@@ -138,19 +212,16 @@ def neighborhood(x,y,height,width):
     :param y: y-coordinate of a cell
     :type y: int
 
+    :param topology: [optional] one of :data:`TOPOLOGIES` (default = 'square')
+    :type topology: str
+
     :return:
     :rtype: list of tuple
 
     :UC: 0 <= x < height and 0 <= y < width
     """
     assert x >= 0 and x < height and y >= 0 and y < width
-    #Top Left; Top; Top Right; Left; Right; Bottom Left; Bottom; Bottom Right 
-    list_side = [(x-1, y-1),(x, y-1),(x+1, y-1),(x-1, y),(x+1, y),(x-1, y+1),(x, y+1),(x+1, y+1)]
-    result = []
-    for cell in list_side:
-        if is_valid_cell(cell, height, width):
-            result.append(cell)
-    return result
+    return [divmod(j, width) for j in __neighbors(height, width, topology)(x*width+y)]
 
 def is_valid_cell(cell, height, width):
     """
@@ -168,14 +239,220 @@ def is_valid_cell(cell, height, width):
         return False
     return True
 
+##############################################
+# Adjacency tables
+##############################################
+
+#: the topologies of the boards: ``'square'`` (8 neighbors in the
+#: board), ``'torus'`` (8 neighbors, the opposite borders being adjacent)
+#: and ``'hex'`` (6 neighbors, odd rows shifted half a cell to the right)
+TOPOLOGIES = ('square', 'torus', 'hex')
+#: number of adjacency tables kept in the cache
+ADJACENCY_CACHE_SIZE = 4
+#: largest board, in cells, whose adjacency table is built; the
+#: neighbors of the cells of larger boards are computed on demand
+MAX_ADJACENCY_CELLS = 1 << 16
+
+# the (dx, dy) of the neighbors, for even and odd rows
+__SQUARE = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+__DELTAS = {'square' : (__SQUARE, __SQUARE),
+            'torus' : (__SQUARE, __SQUARE),
+            'hex' : (((-1, -1), (-1, 0), (0, -1), (0, 1), (1, -1), (1, 0)),
+                     ((-1, 0), (-1, 1), (0, -1), (0, 1), (1, 0), (1, 1)))}
+# the neighbors of the cells of a row, by kind of row
+__templates = {}
+# adjacency tables by (height, width, topology), least recently used
+# first, shared with the thread of the pool and the server's executor
+__adjacency_cache = OrderedDict()
+__adjacency_lock = threading.Lock()
+
+
+def __row (height, width, topology, x):
+    """
+    :return: the neighbors of the cells of row x: a list of
+             ``(k, y1)`` meaning cell ``y1`` of the k-th row of
+             bases, the end in that list of the neighbors of each cell
+             and the index of the first cell of the neighbor rows
+    :rtype: tuple (list of tuple, list of int, list of int)
+    """
+    torus = topology == 'torus'
+    rows = []
+    for dx in (-1, 0, 1):
+        r = x + dx
+        if torus:
+            r %= height
+        elif not 0 <= r < height:
+            r = None
+        rows.append(r)
+    # the rows which exist, merged when they are the same (small tori)
+    shape = tuple(None if r is None else rows.index(r) for r in rows)
+    key = (width, topology, x % 2, shape)
+    template = __templates.get(key)
+    if template is None:
+        if len(__templates) >= 64:
+            __templates.clear()
+        cells = []
+        ends = []
+        for y in range(width):
+            seen = {(shape[1], y)}
+            for dx, dy in __DELTAS[topology][x % 2]:
+                k = shape[dx+1]
+                y1 = y + dy
+                if torus:
+                    y1 %= width
+                elif not 0 <= y1 < width:
+                    continue
+                if k is None or (k, y1) in seen:
+                    continue
+                seen.add((k, y1))
+                cells.append((k, y1))
+            ends.append(len(cells))
+        template = __templates[key] = (cells, ends)
+    cells, ends = template
+    return cells, ends, [0 if r is None else r*width for r in rows]
+
+def __build_adjacency (height, width, topology):
+    """
+    :return: the adjacency table of the board, built row by row from
+             the templates of :func:`__row`
+    :rtype: tuple (array, array)
+    """
+    offsets = array('i', [0])
+    neighbors = array('i')
+    for x in range(height):
+        cells, ends, bases = __row(height, width, topology, x)
+        start = len(neighbors)
+        neighbors.extend([bases[k] + y1 for k, y1 in cells])
+        offsets.extend([start + end for end in ends])
+    return offsets, neighbors
+
+def adjacency (height, width, topology='square'):
+    """
+    return the adjacency table of a board, in the CSR format: the
+    neighbors of the cell of index i (``x*width+y``) are
+    ``neighbors[offsets[i]:offsets[i+1]]``. The tables are computed once
+    and kept in a cache of the :data:`ADJACENCY_CACHE_SIZE` last used
+    boards, which can be used from several threads.
+
+    :param height: height of the board
+    :type height: int
+    :param width: width of the board
+    :type width: int
+    :param topology: [optional] one of :data:`TOPOLOGIES` (default = 'square')
+    :type topology: str
+    :return: the offsets and the neighbors
+    :rtype: tuple (array, array)
+    :UC: 0 < height, width and height*width <= MAX_ADJACENCY_CELLS
+    """
+    assert topology in TOPOLOGIES, 'unknown topology'
+    assert height*width <= MAX_ADJACENCY_CELLS, 'board too large for an adjacency table'
+    key = (height, width, topology)
+    with __adjacency_lock:
+        table = __adjacency_cache.get(key)
+        if table is not None:
+            __adjacency_cache.move_to_end(key)
+            return table
+    table = __build_adjacency(height, width, topology)
+    with __adjacency_lock:
+        table = __adjacency_cache.setdefault(key, table)
+        __adjacency_cache.move_to_end(key)
+        while len(__adjacency_cache) > ADJACENCY_CACHE_SIZE:
+            __adjacency_cache.popitem(last=False)
+    return table
+
+def adjacency_memory (game):
+    """
+    :param game: a minesweeper game
+    :type game: game
+    :return: the number of bytes of the adjacency table of the size and
+             topology of game kept in the cache, 0 if there is none
+    :rtype: int
+    :UC: none
+    """
+    key = (game['height'], game['width'], game.get('topology', 'square'))
+    with __adjacency_lock:
+        table = __adjacency_cache.get(key)
+    if table is None:
+        return 0
+    offsets, neighbors = table
+    return offsets.itemsize*len(offsets) + neighbors.itemsize*len(neighbors)
+
+def __neighbors (height, width, topology):
+    """
+    :return: a function giving the indexes of the neighbors of the cell
+             of index i of the board, read in its adjacency table or,
+             for boards too large for a table, computed cell by cell in
+             the same order (see :func:`__computed_neighbors`)
+    :rtype: function
+    """
+    if height*width > MAX_ADJACENCY_CELLS:
+        return __computed_neighbors(height, width, topology)
+    offsets, neighbors = adjacency(height, width, topology)
+    def around (i):
+        return neighbors[offsets[i]:offsets[i+1]]
+    return around
+
+def __computed_neighbors (height, width, topology):
+    """
+    :return: a function computing the indexes of the neighbors of the
+             cell of index i of the board, in the order of its adjacency
+             table, without building it; the neighbors of a cell away
+             from the borders are i plus constant offsets
+    :rtype: function
+    """
+    deltas = __DELTAS[topology]
+    inner = tuple([dx*width+dy for dx, dy in deltas[k]] for k in (0, 1))
+    torus = topology == 'torus'
+    def around (i):
+        x, y = divmod(i, width)
+        if 0 < x < height-1 and 0 < y < width-1:
+            return [i+d for d in inner[x % 2]]
+        result = []
+        for dx, dy in deltas[x % 2]:
+            x1, y1 = x+dx, y+dy
+            if torus:
+                x1 %= height
+                y1 %= width
+            elif not (0 <= x1 < height and 0 <= y1 < width):
+                continue
+            j = x1*width+y1
+            if j != i and j not in result:
+                result.append(j)
+        return result
+    return around
+
+def __around (game):
+    """
+    :return: the function giving the neighbors of the cells of a flat
+             game, see :func:`__neighbors`; they are always computed for
+             a sparse game
+    :rtype: function
+    """
+    if isinstance(game['grid'], SparseGrid):
+        return __computed_neighbors(game['height'], game['width'], game.get('topology', 'square'))
+    return __neighbors(game['height'], game['width'], game.get('topology', 'square'))
+
+def neighbors_function (game):
+    """
+    :param game: a minesweeper game
+    :type game: game
+    :return: the function giving the indexes ``x*width+y`` of the
+             neighbors of the cell of index i of game, read in the
+             adjacency table of the game or computed (see :func:`adjacency`)
+    :rtype: function
+    :UC: game is not infinite
+    """
+    return __around(game)
+
+
 ##############################################
 # Functions for game's setup and management
 ##############################################
 
-def __make_grid (width,height,nbombs):
+def __make_grid (width,height,nbombs,seed,topology='square'):
     """
     return a minesweeper grid of size width*height cells
-    with nbombs bombs.
+    with nbombs bombs placed from seed.
 
     :param width: horizontal size of game (default = 30)
     :type width: int
@@ -183,24 +460,67 @@ def __make_grid (width,height,nbombs):
     :type height: int
     :param nbombs:  number of bombs (default = 99)
     :type nbombs: int
-    :return: a fresh grid of  width*height cells
-    :rtype: list of list of cells
+    :param seed: seed of the bombs' placement
+    :type seed: int
+    :param topology: [optional] the topology of the grid (default = 'square')
+    :type topology: str
+    :return: a fresh grid of  width*height cells, one byte per cell,
+             cell (x,y) being stored at index x*width+y, and the
+             coordinates of its bombs, in grid order
+    :rtype: tuple (bytearray, tuple of tuple)
     """
     assert 0 < width , 'width must be a positive integer'
     assert 0 < height , 'height must be a positive integer'
     assert 0 <= nbombs <= width*height, "nbombs must don't exceed width*height"
-    coords = [(x,y) for y in range (width) for x in range (height)]
-    random.shuffle (coords)
-    grid =  [[__make_cell () for y in range (width)] for x in range (height)]
-    for i in range (nbombs):
-        x,y = coords[i]
-        grid[x][y]['bomb'] = True
-        for neighbor in neighborhood (x,y, height, width):
-            x1,y1 = neighbor
-            grid[x1][y1]['nbombs_neighborhood'] += 1
-    return grid
-
-def make_game (width=30,height=20,nbombs=99):
+    grid = bytearray (width*height)
+    indexes = random.Random (seed).sample (range (width*height), nbombs)
+    around = __computed_neighbors (height, width, topology)
+    for i in indexes:
+        grid[i] |= CELL_BOMB
+        for j in around (i):
+            grid[j] += 1
+    indexes.sort ()
+    return grid, tuple (divmod (i, width) for i in indexes)
+
+def __make_grid_numpy (width,height,nbombs,seed):
+    """
+    same as :func:`__make_grid`, but bombs are drawn by a single
+    vectorized sample and the numbers of bombs in the neighborhoods are
+    computed for the whole grid at once, as the sum of the 8 shifted
+    copies of the bombs array.
+
+    :param width: horizontal size of game
+    :type width: int
+    :param height:  vertical size of game
+    :type height: int
+    :param nbombs:  number of bombs
+    :type nbombs: int
+    :param seed: seed of the bombs' placement
+    :type seed: int
+    :return: a fresh grid and the coordinates of its bombs, in grid order
+    :rtype: tuple (bytearray, tuple of tuple)
+    :UC: numpy is installed
+    """
+    assert 0 < width , 'width must be a positive integer'
+    assert 0 < height , 'height must be a positive integer'
+    assert 0 <= nbombs <= width*height, "nbombs must don't exceed width*height"
+    rng = numpy.random.default_rng (seed)
+    indexes = numpy.sort (rng.choice (width*height, size=nbombs, replace=False))
+    bombs = numpy.zeros (width*height, dtype=numpy.uint8)
+    bombs[indexes] = 1
+    bombs = bombs.reshape (height, width)
+    padded = numpy.pad (bombs, 1)
+    grid = numpy.zeros ((height, width), dtype=numpy.uint8)
+    for dx in range (3):
+        for dy in range (3):
+            if dx != 1 or dy != 1:
+                grid += padded[dx:dx+height, dy:dy+width]
+    grid |= bombs << 4
+    xs, ys = numpy.divmod (indexes, width)
+    return bytearray (grid.tobytes ()), tuple (zip (xs.tolist (), ys.tolist ()))
+
+def make_game (width=30,height=20,nbombs=99,use_numpy=False,seed=None,no_guess=False,
+               first_click_safe=False,topology='square',sparse=False):
     """
     return a minesweeper game  of size width*height cells
     with nbombs bombs.
@@ -211,19 +531,91 @@ def make_game (width=30,height=20,nbombs=99):
     :type height: int
     :param nbombs: [optional] number of bombs (default = 99)
     :type nbombs: int
+    :param use_numpy: [optional] generate the grid with numpy, which is
+                      much faster for very large games (default = False)
+    :type use_numpy: bool
+    :param seed: [optional] seed of the bombs' placement, random if None
+    :type seed: int
+    :param no_guess: [optional] return a game which can be won without
+                     guessing from the cell ``start`` stored in the game,
+                     see :func:`noguess.make_game`; seed is then the seed of
+                     the search (default = False)
+    :type no_guess: bool
+    :param first_click_safe: [optional] move the bombs away from the cell
+                             first revealed by :func:`reveal_all_cells_from`
+                             and its neighborhood (default = False)
+    :type first_click_safe: bool
+    :param topology: [optional] the topology of the game, one of
+                     :data:`TOPOLOGIES` (default = 'square')
+    :type topology: str
+    :param sparse: [optional] store the grid as a :class:`SparseGrid`, for
+                   huge games with few bombs; the bombs are the same as
+                   without it for a given seed, and :func:`reveal_runs`
+                   reveals runs of cells at once (default = False)
+    :type sparse: bool
     :return: a fresh grid of  width*height cells
-    :UC: 0 < width, height and 0 <= nbombs <= width*height
+    :UC: 0 < width, height and 0 <= nbombs <= width*height and
+         numpy is installed if use_numpy is True and 0 <= seed < 2**64
+         and topology is 'square' if use_numpy or no_guess is True
+         and use_numpy, first_click_safe and sparse are False if no_guess
+         is True and use_numpy is False if sparse is True
+
+    Besides its grid, a game keeps the number of cells without bomb
+    (``nsafe``), the number of them already revealed (``nrevealed``)
+    and whether a bomb has been revealed (``exploded``), so that
+    :func:`get_state` runs in constant time.
+    It also keeps the index of its bombs built while placing them, their
+    coordinates in grid order (``bombs``), and the number of flags around each cell (``flagged``), used by
+    :func:`chord`. The neighbors of its cells are given by the
+    adjacency table of its size and ``topology`` (see :func:`adjacency`)
+    when it has at most :data:`MAX_ADJACENCY_CELLS` cells, and computed
+    otherwise. Placing the bombs never builds a table.
+
+    Without seed, the board is taken from the pool of ready boards when
+    it is started and has one (see :func:`start_pool`).
     """
+    assert topology in TOPOLOGIES, 'unknown topology'
+    assert not (sparse and use_numpy), 'sparse excludes use_numpy'
+    if no_guess:
+        assert topology == 'square', 'no_guess requires a square topology'
+        assert not (use_numpy or first_click_safe or sparse), \
+            'no_guess excludes use_numpy, first_click_safe and sparse'
+        import noguess
+        return noguess.make_game (width,height,nbombs,seed=seed)
+    board = None
+    if seed is None and not use_numpy and not sparse:
+        board = __take_board ((width,height,nbombs,topology))
+    if board is not None:
+        seed, grid, bombs = board
+    else:
+        if seed is None:
+            seed = random.getrandbits (64)
+        if use_numpy:
+            assert numpy is not None, 'use_numpy requires numpy'
+            assert topology == 'square', 'use_numpy requires a square topology'
+            grid, bombs = __make_grid_numpy (width,height,nbombs,seed)
+        elif sparse:
+            grid, bombs = __make_sparse_grid (width,height,nbombs,seed,topology)
+        else:
+            grid, bombs = __make_grid (width,height,nbombs,seed,topology)
     return {'width' : width,
             'height' : height,
             'nbombs' : nbombs,
-            'grid' : __make_grid (width,height,nbombs)}
+            'seed' : seed,
+            'grid' : grid,
+            'bombs' : bombs,
+            'nsafe' : width*height - nbombs,
+            'nrevealed' : 0,
+            'exploded' : False,
+            'first_click_safe' : first_click_safe,
+            'flagged' : {},
+            'topology' : topology}
 
 def get_height (game):
     """
     :param game: a minesweeper game
     :type game: game
-    :return: height of the grid in game
+    :return: height of the grid in game (``None`` for an infinite game)
     :rtype: int
     :UC: none
     """
@@ -233,7 +625,7 @@ def get_width (game):
     """
     :param game: a minesweeper game
     :type game: game
-    :return: width of the grid in game
+    :return: width of the grid in game (``None`` for an infinite game)
     :rtype: int
     :UC: none
     """
@@ -251,23 +643,56 @@ def get_cell (game, x, y):
     :type: cell
     :UC: 0 <= x < height of game and O <= y < width of game 
     """
-    return game['grid'][x][y]
+    width = game['width']
+    if width is None:
+        return (game, (x, y))
+    return (game, x*width+y)
+
+def grid_memory (game):
+    """
+    :param game: a minesweeper game
+    :type game: game
+    :return: the number of bytes used to store the cells of game,
+             that is ``CELL_SIZE * width * height``, or an estimate of
+             the memory of a :class:`SparseGrid`
+    :rtype: int
+    :UC: none
+    """
+    grid = game['grid']
+    if isinstance(grid, SparseGrid):
+        return grid.memory()
+    return len(grid) * CELL_SIZE
 
 def get_bombs_grid(game):
     """
     Return a list of tuple, each tuple is coordinates of bomb
     :param game: a minesweeper game
     :type game: game
-    :return: list of bombs tuple
+    :return: list of bombs tuple, in grid order
     :rtype: list
-    :UC: none
+    :UC: game is not infinite
     """
-    l_bombs=[]
-    for x in range(get_height(game)):
-        for y in range(get_width(game)):
-            if is_bomb(get_cell(game,x,y)) == True:
-                l_bombs += [(x,y)]
-    return l_bombs
+    if game['bombs'] is None:
+        __index_bombs(game)
+    return list(game['bombs'])
+
+def __index_bombs (game):
+    """
+    build the bomb index of a game loaded by :func:`load_game`, or whose
+    bombs were moved by its first click.
+    """
+    grid = game['grid']
+    if isinstance(grid, (PlanarGrid, SparseGrid)):
+        indexes = grid.bombs()
+    else:
+        marks = grid.translate(bytes(1 if c & CELL_BOMB else 0 for c in range(256)))
+        indexes = []
+        i = marks.find(1)
+        while i != -1:
+            indexes.append(i)
+            i = marks.find(1, i+1)
+    width = get_width(game)
+    game['bombs'] = tuple(divmod(i, width) for i in indexes)
 
 def get_state (game):
     """
@@ -276,45 +701,1340 @@ def get_state (game):
     :return: the state of the game (winning, losing or unfinished)
     :rtype: GameState
     :UC: none
+
+    The state is read from the counters maintained by :func:`reveal`
+    and :func:`reveal_all_cells_from`, in constant time. An infinite
+    game is never won.
     """
-    bomb_l = get_bombs_grid(game)
-    for bomb in bomb_l:
-        if is_revealed(get_cell(game, bomb[0], bomb[1])):
-            return GameState.losing
-    for x in range(get_height(game)):
-        for y in range(get_width(game)):
-            c = get_cell(game, x, y)
-            if not is_revealed(c) and not is_bomb(c):
-                return GameState.unfinished
-    return GameState.winning
-            
-    
+    if game['exploded']:
+        return GameState.losing
+    if game['nrevealed'] == game['nsafe']:
+        return GameState.winning
+    return GameState.unfinished
+
 
 def reveal_all_cells_from (game, x, y):
     """
-    :param game: 
+    reveal cell (x,y) and, when it has no bomb in its neighborhood,
+    spread to its 8 neighbors until numbered cells are reached.
+    Flagged cells are not revealed, neither by the spreading nor when
+    they are the initial cell. In a game made with
+    ``first_click_safe``, the first call first moves the bombs away from
+    cell (x,y) and its neighborhood.
+
+    The spreading uses an explicit stack instead of recursion, so it
+    works on grids of any size, and each cell is visited at most once.
+    In a sparse game, it reveals whole runs of cells of a row at once,
+    see :func:`reveal_runs`, which returns these runs instead of the
+    coordinates of all their cells.
+
+    :param game: a minesweeper game
     :type game: game
-    :param x: 
-    :return: none
+    :param x: x-coordinate of the initial cell
+    :type x: int
+    :param y: y-coordinate of the initial cell
+    :type y: int
+    :return: the coordinates of the cells revealed by this call
+    :rtype: list of tuple
     :Side effect: reveal all cells of game game from the initial cell (x,y).
-    :UC: 0 <= x < height of game and O <= y < width of game 
+    :UC: none
     """
+    height, width = get_height(game), get_width(game)
+    if width is None:
+        return __reveal_all_cells_from_unbounded(game, x, y)
+    if not (0 <= x < height and 0 <= y < width):
+        return []
+    grid = game['grid']
+    i = x*width+y
+    if grid[i] & (CELL_REVEALED | CELL_HYPOTHETIC):
+        return []
+    if game.get('first_click_safe'):
+        __clear_first_click(game, x, y)
+    if isinstance(grid, SparseGrid):
+        return __cells_of_runs(__reveal_sparse(game, x, y))
+    grid[i] |= CELL_REVEALED
+    revealed = [(x, y)]
+    if grid[i] & CELL_BOMB:
+        game['exploded'] = True
+        return revealed
+    if grid[i] & CELL_COUNT:
+        game['nrevealed'] += 1
+        return revealed
+    around = __around(game)
+    stack = [i]
+    while stack:
+        for j in around(stack.pop()):
+            c = grid[j]
+            if c & (CELL_REVEALED | CELL_HYPOTHETIC):
+                continue
+            grid[j] = c | CELL_REVEALED
+            revealed.append(divmod(j, width))
+            if not c & CELL_COUNT:
+                stack.append(j)
+    game['nrevealed'] += len(revealed)
+    return revealed
 
+def chord (game, x, y):
+    """
+    reveal, with :func:`reveal_all_cells_from`, the neighbors of the
+    revealed cell (x,y) which are not flagged, when it has as many flags
+    as bombs around it. Nothing is done otherwise.
 
-    
-    if y == get_width(game) or x == get_height(game) or x < 0 or y < 0:
+    The number of flags around each cell is kept up to date by
+    :func:`set_hypothetic` and :func:`unset_hypothetic`, so checking
+    whether the chord is allowed costs O(1).
+
+    :param game: a minesweeper game
+    :type game: game
+    :param x: x-coordinate of the cell
+    :type x: int
+    :param y: y-coordinate of the cell
+    :type y: int
+    :return: the coordinates of the cells revealed by this call
+    :rtype: list of tuple
+    :UC: none
+    """
+    return __chord(game, x, y, reveal_all_cells_from)
+
+def __chord (game, x, y, reveal):
+    """
+    :func:`chord`, revealing the neighbors of (x,y) with the function
+    reveal, :func:`reveal_all_cells_from` or :func:`reveal_runs`.
+
+    :return: what reveal returned for the neighbors
+    :rtype: list of tuple
+    """
+    height, width = get_height(game), get_width(game)
+    if width is not None and not (0 <= x < height and 0 <= y < width):
+        return []
+    _, i = get_cell(game, x, y)
+    c = game['grid'][i]
+    if not c & CELL_REVEALED or c & CELL_BOMB or not c & CELL_COUNT:
+        return []
+    if width is None:
+        neighbors = [(x1, y1) for x1 in (x-1, x, x+1) for y1 in (y-1, y, y+1)
+                     if x1 != x or y1 != y]
+        flags = sum(1 for x1, y1 in neighbors
+                    if is_hypothetic_bomb(get_cell(game, x1, y1)))
+    else:
+        neighbors = [divmod(j, width) for j in __around(game)(i)]
+        flags = __flag_counts(game).get(i, 0)
+    if flags != c & CELL_COUNT:
+        return []
+    revealed = []
+    for x1, y1 in neighbors:
+        revealed.extend(reveal(game, x1, y1))
+    return revealed
+
+def __flag_counts (game):
+    """
+    :return: the numbers of flags around the cells of game, by index,
+             built again if the game doesn't keep them (loaded or
+             replayed games)
+    :rtype: dict
+    """
+    counts = game.get('flagged')
+    if counts is None:
+        counts = game['flagged'] = {}
+        grid = game['grid']
+        if isinstance(grid, PlanarGrid):
+            indexes = [i for i in range(len(grid)) if grid[i] & CELL_HYPOTHETIC]
+        elif isinstance(grid, SparseGrid):
+            indexes = grid.flags
+        else:
+            marks = grid.translate(bytes(1 if c & CELL_HYPOTHETIC else 0 for c in range(256)))
+            indexes = []
+            i = marks.find(1)
+            while i != -1:
+                indexes.append(i)
+                i = marks.find(1, i+1)
+        for i in indexes:
+            __count_flag(game, i, 1)
+    return counts
+
+
+def __move_bomb (game, i, j):
+    """
+    move the bomb of the cell of index i to the free cell of index j,
+    updating only the numbers of bombs of their neighborhoods.
+    """
+    grid = game['grid']
+    around = __around(game)
+    grid[i] &= ~CELL_BOMB
+    for k in around(i):
+        grid[k] -= 1
+    grid[j] |= CELL_BOMB
+    for k in around(j):
+        grid[k] += 1
+
+def __clear_first_click (game, x, y):
+    """
+    move the bombs of cell (x,y) and of its neighborhood to free cells
+    drawn at random out of it, or only the bomb of (x,y) when the grid is
+    too dense. Each bomb costs O(1), whatever the size of the grid, and
+    the bomb index, if built, is updated in place.
+    """
+    game['first_click_safe'] = False
+    height, width = get_height(game), get_width(game)
+    grid = game['grid']
+    area = width*height
+    zone = [x*width+y]
+    zone.extend(__around(game)(x*width+y))
+    if game['nbombs'] > area - len(zone):
+        zone = [x*width+y]
+        if game['nbombs'] == area:
+            return
+    zone = set(zone)
+    moved = sorted(i for i in zone if grid[i] & CELL_BOMB)
+    if not moved:
+        return
+    rng = random.Random('{}:{}:{}'.format(game['seed'], x, y))
+    bombs = None if game['bombs'] is None else list(game['bombs'])
+    for i in moved:
+        j = rng.randrange(area)
+        while j in zone or grid[j] & CELL_BOMB:
+            j = rng.randrange(area)
+        __move_bomb(game, i, j)
+        if bombs is not None:
+            del bombs[bisect.bisect_left(bombs, divmod(i, width))]
+            bisect.insort(bombs, divmod(j, width))
+    if bombs is not None:
+        game['bombs'] = tuple(bombs)
+
+def __reveal_all_cells_from_unbounded (game, x, y):
+    """
+    :func:`reveal_all_cells_from` for an infinite game, where cells are
+    addressed by their coordinates and every cell has 8 neighbors.
+    """
+    grid = game['grid']
+    c = grid[x, y]
+    if c & (CELL_REVEALED | CELL_HYPOTHETIC):
+        return []
+    grid[x, y] = c | CELL_REVEALED
+    revealed = [(x, y)]
+    if c & CELL_BOMB:
+        game['exploded'] = True
+        return revealed
+    if c & CELL_COUNT:
+        game['nrevealed'] += 1
+        return revealed
+    stack = [(x, y)]
+    while stack:
+        x, y = stack.pop()
+        for x1 in (x-1, x, x+1):
+            for y1 in (y-1, y, y+1):
+                c = grid[x1, y1]
+                if c & (CELL_REVEALED | CELL_HYPOTHETIC):
+                    continue
+                grid[x1, y1] = c | CELL_REVEALED
+                revealed.append((x1, y1))
+                if not c & CELL_COUNT:
+                    stack.append((x1, y1))
+    game['nrevealed'] += len(revealed)
+    return revealed
+
+
+def reveal_runs (game, x, y):
+    """
+    :func:`reveal_all_cells_from`, returning the runs of cells revealed
+    instead of their coordinates. In a sparse game, whole runs of cells
+    of a row are revealed at once and a reveal costs the number of runs
+    and of marked cells met, not the number of cells (see
+    :func:`__reveal_sparse`).
+
+    :param game: a minesweeper game
+    :type game: game
+    :param x: x-coordinate of the initial cell
+    :type x: int
+    :param y: y-coordinate of the initial cell
+    :type y: int
+    :return: the runs ``(x, start, end)`` of the cells start to end
+             (excluded) of row x revealed by this call, of a single cell
+             each in a game which is not sparse
+    :rtype: list of tuple
+    :Side effect: see :func:`reveal_all_cells_from`
+    :UC: game is not infinite
+    """
+    grid = game['grid']
+    if not isinstance(grid, SparseGrid):
+        return [(x1, y1, y1+1) for x1, y1 in reveal_all_cells_from(game, x, y)]
+    if not (0 <= x < game['height'] and 0 <= y < game['width']):
+        return []
+    if grid[x*game['width']+y] & (CELL_REVEALED | CELL_HYPOTHETIC):
+        return []
+    if game.get('first_click_safe'):
+        __clear_first_click(game, x, y)
+    return __reveal_sparse(game, x, y)
+
+def __cells_of_runs (runs):
+    """
+    :return: the coordinates of the cells of the runs ``(x, start, end)``
+    :rtype: list of tuple
+    """
+    return [(x, y) for x, start, end in runs for y in range(start, end)]
+
+def __reveal_sparse (game, x, y):
+    """
+    :func:`reveal_all_cells_from` for a sparse game, by a scanline flood
+    fill: each run of cells without bomb around, between two marked or
+    revealed cells of a row, is revealed at once, then the neighbors of
+    the run in its row and in the rows above and below are visited by
+    walking their marked cells and revealed intervals. It costs the
+    number of runs and of marked cells met, not the number of cells.
+
+    :return: the runs ``(x, start, end)`` revealed
+    :rtype: list of tuple
+    """
+    grid = game['grid']
+    height, width = game['height'], game['width']
+    c = grid[x*width+y]
+    if c & (CELL_BOMB | CELL_COUNT):
+        grid[x*width+y] = c | CELL_REVEALED
+        if c & CELL_BOMB:
+            game['exploded'] = True
+        else:
+            game['nrevealed'] += 1
+        return [(x, y, y+1)]
+    topology = game.get('topology', 'square')
+    torus = topology == 'torus'
+    # the columns y+dlo to y+dhi of the neighbors of a cell (x,y) in the
+    # rows above and below it, by parity of x: those of the run [lo, hi)
+    # are [lo+dlo, hi+dhi)
+    spans = []
+    for deltas in __DELTAS[topology]:
+        dys = [dy for dx, dy in deltas if dx]
+        spans.append((min(dys), max(dys)))
+    marks, rows = grid.marks, grid.revealed
+    revealed = []
+    stack = [(x, y)]
+
+    def visit (r, c0, c1):
+        # reveal the hidden numbered cells of columns [c0, c1) of row r,
+        # and push the first cell of each of its hidden runs without bomb
+        # around
+        if torus:
+            r %= height
+            if c1 - c0 >= width:
+                pieces = [(0, width)]
+            else:
+                c0, c1 = c0 % width, c0 % width + c1 - c0
+                pieces = [(c0, min(c1, width))] + ([(0, c1 - width)] if c1 > width else [])
+        elif 0 <= r < height:
+            pieces = [(max(c0, 0), min(c1, width))]
+        else:
+            return
+        runs = rows.get(r, ())
+        row_marks = marks.get(r, ())
+        numbered = []
+        for a, b in pieces:
+            k = bisect.bisect_right(runs, a)
+            m = bisect.bisect_left(row_marks, a)
+            pos = a
+            while pos < b:
+                if k & 1:
+                    # pos is in the revealed interval [runs[k-1], runs[k])
+                    pos = runs[k]
+                    k += 1
+                    continue
+                end = min(runs[k] if k < len(runs) else width, b)
+                while m < len(row_marks) and row_marks[m] < pos:
+                    m += 1
+                while pos < end:
+                    mark = row_marks[m] if m < len(row_marks) else width
+                    if mark > pos:
+                        stack.append((r, pos))
+                        pos = min(mark, end)
+                    else:
+                        if not grid[r*width+pos] & (CELL_HYPOTHETIC | CELL_BOMB):
+                            numbered.append(pos)
+                        pos += 1
+                        m += 1
+                if k < len(runs) and pos == runs[k]:
+                    k += 1
+        for pos in numbered:
+            grid.reveal_run(r, pos, pos+1)
+            revealed.append((r, pos, pos+1))
+
+    while stack:
+        r, y = stack.pop()
+        runs = rows.get(r, ())
+        k = bisect.bisect_right(runs, y)
+        if k & 1:
+            continue
+        row_marks = marks.get(r, ())
+        m = bisect.bisect_right(row_marks, y)
+        lo = max(row_marks[m-1] + 1 if m else 0, runs[k-1] if k else 0)
+        hi = min(row_marks[m] if m < len(row_marks) else width,
+                 runs[k] if k < len(runs) else width)
+        grid.reveal_run(r, lo, hi)
+        revealed.append((r, lo, hi))
+        visit(r, lo-1, lo)
+        visit(r, hi, hi+1)
+        dlo, dhi = spans[r % 2]
+        visit(r-1, lo+dlo, hi+dhi)
+        visit(r+1, lo+dlo, hi+dhi)
+    game['nrevealed'] += sum(end - start for _, start, end in revealed)
+    return revealed
+
+
+##############################################
+# Pool of ready boards
+##############################################
+
+# the pool: ready boards by (width, height, nbombs, topology), least
+# recently asked first, and the time each configuration was last asked
+__pool = OrderedDict()
+__pool_asked = {}
+__pool_lock = threading.Condition()
+__pool_stop = threading.Event()
+__pool_thread = None
+
+def start_pool (configs=(), depth=4, max_configs=8, idle=300.0):
+    """
+    start a background thread keeping ready boards for
+    :func:`make_game`, which takes one instead of generating it when it
+    is called without seed (and without numpy). Besides the given
+    configurations, the configurations asked to :func:`make_game` are
+    added to the pool; the least recently asked ones are evicted beyond
+    max_configs, and the ones not asked for idle seconds are evicted too.
+
+    The boards are generated by :func:`make_game` from a random seed, so
+    a game from the pool is the same as a game made with its seed. The
+    pool holds at most max_configs*depth boards, one byte per cell.
+
+    :param configs: [optional] the (width, height, nbombs) or
+                    (width, height, nbombs, topology) of the boards to
+                    prepare from the start (default = none)
+    :type configs: list of tuple
+    :param depth: [optional] number of ready boards per configuration
+                  (default = 4)
+    :type depth: int
+    :param max_configs: [optional] maximal number of configurations
+                        (default = 8)
+    :type max_configs: int
+    :param idle: [optional] number of seconds after which a configuration
+                 nobody asked is evicted (default = 300)
+    :type idle: float
+    :return: None
+    :rtype: NoneType
+    :Side effect: replace the running pool thread, if any
+    :UC: 0 < depth and 0 < max_configs, the configurations are valid
+    """
+    global __pool_thread
+    stop_pool()
+    now = time.monotonic()
+    with __pool_lock:
+        for config in configs:
+            key = tuple(config) + ('square',) * (4 - len(config))
+            __pool.setdefault(key, deque())
+            __pool_asked[key] = now
+    __pool_stop.clear()
+    __pool_thread = threading.Thread(target=__fill_pool, args=(depth, max_configs, idle),
+                                     name='minesweeper-pool', daemon=True)
+    __pool_thread.start()
+
+def stop_pool ():
+    """
+    stop the thread filling the pool, if any, and forget the ready boards.
+
+    :return: None
+    :rtype: NoneType
+    """
+    global __pool_thread
+    if __pool_thread is not None:
+        __pool_stop.set()
+        with __pool_lock:
+            __pool_lock.notify()
+        __pool_thread.join()
+        __pool_thread = None
+    with __pool_lock:
+        __pool.clear()
+        __pool_asked.clear()
+
+def pool_size ():
+    """
+    :return: the number of ready boards of each configuration of the pool
+    :rtype: dict
+    """
+    with __pool_lock:
+        return {key : len(ready) for key, ready in __pool.items()}
+
+def __take_board (key):
+    """
+    :return: a ready board ``(seed, grid, bombs)`` of the
+             configuration key, or ``None`` when the pool has none; an
+             unknown configuration is added to the pool
+    :rtype: tuple
+    """
+    if __pool_thread is None:
         return None
-    cell=get_cell(game, x, y)
-    if is_bomb(cell):
-        return reveal(cell)
-    if number_of_bombs_in_neighborhood (cell) != 0 or is_revealed(cell):
-        reveal(cell)
-    else:      
-        reveal(cell)
-        reveal_all_cells_from (game, x+1, y)
-        reveal_all_cells_from (game, x-1, y)
-        reveal_all_cells_from (game, x, y+1)
-        reveal_all_cells_from (game, x, y-1)
-        
+    with __pool_lock:
+        __pool_asked[key] = time.monotonic()
+        ready = __pool.get(key)
+        if ready is None:
+            __pool[key] = deque()
+            __pool_lock.notify()
+            return None
+        __pool.move_to_end(key)
+        __pool_lock.notify()
+        return ready.popleft() if ready else None
+
+def __fill_pool (depth, max_configs, idle):
+    """
+    the loop of the thread filling the pool, until it is stopped.
+    """
+    while not __pool_stop.is_set():
+        with __pool_lock:
+            now = time.monotonic()
+            for key in list(__pool):
+                if len(__pool) > max_configs or now - __pool_asked[key] > idle:
+                    del __pool[key]
+                    del __pool_asked[key]
+            # the most recently asked configuration missing boards
+            missing = [key for key in reversed(__pool) if len(__pool[key]) < depth]
+            if not missing:
+                __pool_lock.wait(1.0)
+                continue
+        width, height, nbombs, topology = key = missing[0]
+        seed = random.getrandbits(64)
+        grid, bombs = __make_grid(width, height, nbombs, seed, topology)
+        with __pool_lock:
+            ready = __pool.get(key)
+            if ready is not None:
+                ready.append((seed, grid, bombs))
+
+
+##############################################
+# Undo and redo
+##############################################
+
+#: the number of moves kept by :func:`play_move` to be undone
+UNDO_DEPTH = 100
+
+def __pack_cells (game, cells):
+    """
+    :return: the cells changed by a move, as returned by :func:`__play`,
+             packed in an array: their indexes ``x*width+y``, 4 bytes each on
+             grids of less than 2**31 cells, the flattened runs
+             ``(x, start, end)`` of a sparse game, or the flattened
+             coordinates of an infinite game
+    :rtype: array
+    """
+    width = game['width']
+    if width is None or isinstance(game['grid'], SparseGrid):
+        return array('q', [v for cell in cells for v in cell])
+    typecode = 'i' if width*game['height'] < 1<<31 else 'q'
+    return array(typecode, [x*width+y for x, y in cells])
+
+def __unpack_cells (game, packed):
+    """
+    :return: the coordinates of the cells packed by :func:`__pack_cells`
+    :rtype: list of tuple
+    """
+    width = game['width']
+    values = iter(packed)
+    if isinstance(game['grid'], SparseGrid):
+        return __cells_of_runs(zip(values, values, values))
+    if width is None:
+        return list(zip(values, values))
+    return [divmod(i, width) for i in packed]
+
+def __play (game, x, y, action):
+    """
+    play a move on game without keeping it.
+
+    :return: the action undoing the move and the cells changed by the
+             move, as their runs in a sparse game
+    :rtype: tuple (str, list of tuple)
+    """
+    reveal = reveal_runs if isinstance(game['grid'], SparseGrid) else reveal_all_cells_from
+    if action == 'R':
+        return action, reveal(game, x, y)
+    if action == 'C':
+        # a chord is undone as a reveal of the cells it revealed
+        return 'R', __chord(game, x, y, reveal)
+    cell = get_cell(game, x, y)
+    flagged = is_hypothetic_bomb(cell)
+    if action == 'S':
+        set_hypothetic(cell)
+    else:
+        unset_hypothetic(cell)
+    if is_hypothetic_bomb(cell) == flagged:
+        return action, []
+    if isinstance(game['grid'], SparseGrid):
+        return action, [(x, y, y+1)]
+    return action, [(x, y)]
+
+def play_move (game, x, y, action):
+    """
+    play a move on game and keep what it changed, to undo it.
+
+    The moves which changed something are pushed, with only the cells
+    they changed packed in an array, on the ``undo`` list of the game
+    (created on the first move), which keeps the last :data:`UNDO_DEPTH`
+    moves, and the ``redo`` list is emptied.
+
+    :param game: a minesweeper game
+    :type game: game
+    :param x: x-coordinate of the played cell
+    :type x: int
+    :param y: y-coordinate of the played cell
+    :type y: int
+    :param action: ``'R'`` to reveal the cell (see
+                   :func:`reveal_all_cells_from`), ``'S'`` to set a flag
+                   on it, ``'U'`` to unset it and ``'C'`` to chord on it
+                   (see :func:`chord`)
+    :type action: str
+    :return: the coordinates of the cells changed by the move
+    :rtype: list of tuple
+    :UC: action is ``'R'``, ``'S'``, ``'U'`` or ``'C'``
+    """
+    action, changed = __play(game, x, y, action)
+    if changed:
+        moves = game.setdefault('undo', [])
+        moves.append((action, __pack_cells(game, changed)))
+        if len(moves) > UNDO_DEPTH:
+            del moves[0]
+        game['redo'] = []
+    if isinstance(game['grid'], SparseGrid):
+        return __cells_of_runs(changed)
+    return changed
+
+def __apply (game, action, packed, backward):
+    """
+    set (or clear when backward) the bits changed by a move on its
+    cells, packed by :func:`__pack_cells`, keeping the counters of
+    :func:`get_state` up to date.
+    """
+    grid = game['grid']
+    if isinstance(grid, SparseGrid):
+        __apply_runs(game, action, packed, backward)
+        return
+    if game['width'] is None:
+        values = iter(packed)
+        keys = zip(values, values)
+    else:
+        keys = packed
+    if action == 'R':
+        for i in keys:
+            c = grid[i]
+            if backward:
+                grid[i] = c & ~CELL_REVEALED
+            else:
+                grid[i] = c | CELL_REVEALED
+            if c & CELL_BOMB:
+                game['exploded'] = not backward
+            elif backward:
+                game['nrevealed'] -= 1
+            else:
+                game['nrevealed'] += 1
+    else:
+        for i in keys:
+            if (action == 'S') != backward:
+                set_hypothetic((game, i))
+            else:
+                unset_hypothetic((game, i))
+
+def __apply_runs (game, action, packed, backward):
+    """
+    :func:`__apply` for a sparse game, whose moves changed runs of cells.
+    """
+    grid = game['grid']
+    width = game['width']
+    values = iter(packed)
+    for x, start, end in zip(values, values, values):
+        if action != 'R':
+            if (action == 'S') != backward:
+                set_hypothetic((game, x*width+start))
+            else:
+                unset_hypothetic((game, x*width+start))
+            continue
+        if backward:
+            grid.hide_run(x, start, end)
+        else:
+            grid.reveal_run(x, start, end)
+        if grid[x*width+start] & CELL_BOMB:
+            game['exploded'] = not backward
+        elif backward:
+            game['nrevealed'] -= end - start
+        else:
+            game['nrevealed'] += end - start
+
+def undo_move (game):
+    """
+    undo the last move played with :func:`play_move` and not undone. It
+    costs the number of cells changed by the move, not the size of the
+    grid. The bombs moved by the first move of a ``first_click_safe``
+    game stay where they are.
+
+    :param game: a minesweeper game
+    :type game: game
+    :return: the coordinates of the cells changed back, empty if there
+             is no move to undo
+    :rtype: list of tuple
+    """
+    moves = game.get('undo')
+    if not moves:
+        return []
+    action, packed = moves.pop()
+    __apply(game, action, packed, True)
+    game.setdefault('redo', []).append((action, packed))
+    return __unpack_cells(game, packed)
+
+def redo_move (game):
+    """
+    play again the last move undone by :func:`undo_move`, if no other
+    move was played since.
+
+    :param game: a minesweeper game
+    :type game: game
+    :return: the coordinates of the cells changed again, empty if there
+             is no move to redo
+    :rtype: list of tuple
+    """
+    moves = game.get('redo')
+    if not moves:
+        return []
+    action, packed = moves.pop()
+    __apply(game, action, packed, False)
+    game['undo'].append((action, packed))
+    return __unpack_cells(game, packed)
+
+
+##############################################
+# Batched moves
+##############################################
+
+def apply_moves (game, moves, record_undo=True):
+    """
+    play several moves and merge what they changed. The moves after the
+    one which finishes the game, lost or won, are not played.
+
+    :param game: a minesweeper game
+    :type game: game
+    :param moves: the moves ``(x, y, action)``, where action is ``'R'``,
+                  ``'S'``, ``'U'`` or ``'C'``, or ``'Z'`` and ``'Y'`` to undo
+                  and redo a move (x and y are then ignored)
+    :type moves: iterable of tuple
+    :param record_undo: [optional] play the moves with :func:`play_move`,
+                        so each one can be undone (default = True), or
+                        directly, without keeping any history
+    :type record_undo: bool
+    :return: the coordinates of the cells changed by the moves, each one
+             once in the order of their first change, and the final state
+    :rtype: tuple (list of tuple, GameState)
+    :UC: see :func:`play_move`, and no action is ``'Z'`` or ``'Y'`` if
+         record_undo is False
+    """
+    changed = {}
+    for x, y, action in moves:
+        if game['exploded'] or game['nrevealed'] == game['nsafe']:
+            break
+        if action == 'Z':
+            cells = undo_move(game)
+        elif action == 'Y':
+            cells = redo_move(game)
+        elif record_undo:
+            cells = play_move(game, x, y, action)
+        else:
+            _, cells = __play(game, x, y, action)
+            if isinstance(game['grid'], SparseGrid):
+                cells = __cells_of_runs(cells)
+        changed.update(dict.fromkeys(cells))
+    return list(changed), get_state(game)
+
+
+##############################################
+# Sparse games
+##############################################
+
+class SparseGrid:
+    """
+    A grid storing only what differs from a hidden cell without bomb
+    around: the set of the bombs, the numbers of bombs around the cells
+    next to them, the set of the flags and, for each row, the revealed
+    cells as a sorted flat list of intervals ``[start, end)``. For each
+    row, it also keeps the sorted columns of its marked cells, the ones
+    with a bomb, a number or a flag, which bound the runs of cells
+    revealed at once by :func:`reveal_runs`. Its memory grows
+    with the number of bombs, flags and revealed intervals, not with
+    the size of the grid.
+
+    Cells are read and written with ``grid[i]``, ``i`` being ``x*width+y``,
+    as bytes encoded like the cells of :func:`make_game` grids.
+
+    >>> dense = make_game(60, 40, 30, seed=4)
+    >>> sparse = make_game(60, 40, 30, seed=4, sparse=True)
+    >>> runs = reveal_runs(sparse, 20, 30)
+    >>> cells = reveal_all_cells_from(dense, 20, 30)
+    >>> len(runs) < len(cells)
+    True
+    >>> sorted((x, y) for x, start, end in runs for y in range(start, end)) == sorted(cells)
+    True
+    >>> bytes(sparse['grid']) == dense['grid'] and sparse['nrevealed'] == dense['nrevealed']
+    True
+
+    The other moves return coordinates, as in the other games:
+
+    >>> sparse = make_game(60, 40, 30, seed=4, sparse=True)
+    >>> sorted(play_move(sparse, 20, 30, 'R')) == sorted(cells)
+    True
+    >>> sorted(undo_move(sparse)) == sorted(cells)
+    True
+    >>> sparse['nrevealed'], sparse['grid'].revealed
+    (0, {})
+    """
+
+    #: the bits of a marked cell
+    MARKED = CELL_COUNT | CELL_BOMB | CELL_HYPOTHETIC
+
+    def __init__ (self, width, height, bombs, counts):
+        self.width = width
+        self.height = height
+        self.bomb_cells = bombs
+        self.counts = counts
+        self.flags = set()
+        self.revealed = {}
+        self.marks = {}
+        for i in bombs.union(counts):
+            x, y = divmod(i, width)
+            self.marks.setdefault(x, []).append(y)
+        for row in self.marks.values():
+            row.sort()
+
+    def bombs (self):
+        """
+        :return: the indexes of the cells with a bomb, in grid order
+        :rtype: list of int
+        """
+        return sorted(self.bomb_cells)
+
+    def memory (self):
+        """
+        :return: an estimate of the number of bytes used by the grid
+        :rtype: int
+        """
+        return (sys.getsizeof(self.bomb_cells) + sys.getsizeof(self.counts)
+                + sys.getsizeof(self.flags) + sys.getsizeof(self.revealed)
+                + sum(sys.getsizeof(runs) for runs in self.revealed.values())
+                + sys.getsizeof(self.marks)
+                + sum(sys.getsizeof(row) for row in self.marks.values()))
+
+    def reveal_run (self, x, start, end):
+        """
+        mark as revealed the cells start to end (excluded) of row x.
+
+        :UC: these cells are hidden
+        """
+        runs = self.revealed.setdefault(x, [])
+        k = bisect.bisect_right(runs, start)
+        # [start, end) is in the gap between runs[k-1] and runs[k]
+        after = k > 0 and runs[k-1] == start
+        before = k < len(runs) and runs[k] == end
+        if after and before:
+            del runs[k-1:k+1]
+        elif after:
+            runs[k-1] = end
+        elif before:
+            runs[k] = start
+        else:
+            runs[k:k] = [start, end]
+
+    def hide_run (self, x, start, end):
+        """
+        mark as hidden the cells start to end (excluded) of row x.
+
+        :UC: these cells are revealed
+        """
+        runs = self.revealed[x]
+        k = bisect.bisect_right(runs, start)
+        # [start, end) is in the interval [runs[k-1], runs[k])
+        if runs[k-1] == start and runs[k] == end:
+            del runs[k-1:k+1]
+        elif runs[k-1] == start:
+            runs[k-1] = end
+        elif runs[k] == end:
+            runs[k] = start
+        else:
+            runs[k:k] = [start, end]
+        if not runs:
+            del self.revealed[x]
 
+    def __getitem__ (self, i):
+        c = self.counts.get(i, 0)
+        if i in self.bomb_cells:
+            c |= CELL_BOMB
+        if i in self.flags:
+            c |= CELL_HYPOTHETIC
+        x, y = divmod(i, self.width)
+        runs = self.revealed.get(x)
+        if runs and bisect.bisect_right(runs, y) & 1:
+            c |= CELL_REVEALED
+        return c
 
+    def __setitem__ (self, i, value):
+        c = self[i]
+        changed = c ^ value
+        if changed & CELL_COUNT:
+            if value & CELL_COUNT:
+                self.counts[i] = value & CELL_COUNT
+            else:
+                del self.counts[i]
+        if changed & CELL_BOMB:
+            if value & CELL_BOMB:
+                self.bomb_cells.add(i)
+            else:
+                self.bomb_cells.discard(i)
+        if changed & CELL_HYPOTHETIC:
+            if value & CELL_HYPOTHETIC:
+                self.flags.add(i)
+            else:
+                self.flags.discard(i)
+        x, y = divmod(i, self.width)
+        if bool(c & self.MARKED) != bool(value & self.MARKED):
+            if value & self.MARKED:
+                bisect.insort(self.marks.setdefault(x, []), y)
+            else:
+                row = self.marks[x]
+                del row[bisect.bisect_left(row, y)]
+                if not row:
+                    del self.marks[x]
+        if changed & CELL_REVEALED:
+            if value & CELL_REVEALED:
+                self.reveal_run(x, y, y+1)
+            else:
+                self.hide_run(x, y, y+1)
+
+    def __len__ (self):
+        return self.width * self.height
+
+    def __iter__ (self):
+        return (self[i] for i in range(len(self)))
+
+def __make_sparse_grid (width,height,nbombs,seed,topology='square'):
+    """
+    :func:`__make_grid` for a :class:`SparseGrid`: the same bombs are
+    drawn from the seed, in O(nbombs) time and memory.
+    """
+    assert 0 < width , 'width must be a positive integer'
+    assert 0 < height , 'height must be a positive integer'
+    assert 0 <= nbombs <= width*height, "nbombs must don't exceed width*height"
+    indexes = random.Random (seed).sample (range (width*height), nbombs)
+    around = __computed_neighbors (height, width, topology)
+    counts = {}
+    for i in indexes:
+        for j in around (i):
+            counts[j] = counts.get (j, 0) + 1
+    grid = SparseGrid (width, height, set (indexes), counts)
+    indexes.sort ()
+    return grid, tuple (divmod (i, width) for i in indexes)
+
+
+##############################################
+# Infinite games
+##############################################
+
+class ChunkedGrid:
+    """
+    An unbounded grid split in square chunks of ``size*size`` cells.
+
+    A chunk is generated when one of its cells is first accessed. Its
+    bombs are drawn from a random generator seeded by the grid's seed
+    and the chunk coordinates, so the bombs of any chunk can be computed
+    again at any time: this is how the numbers of bombs in the
+    neighborhood of cells on a chunk border take the bombs of the
+    adjacent chunks into account.
+
+    Cells are read and written with ``grid[x, y]``, as bytes encoded
+    like the cells of :func:`make_game` grids.
+
+    Chunks nobody touched, or whose cells without bomb are all revealed,
+    can be evicted (see :meth:`evict`) since they can be rebuilt from the
+    seed. Flags put in a resolved chunk are lost when it is evicted.
+    """
+
+    def __init__ (self, size, nbombs, seed, max_chunks):
+        self.size = size
+        self.nbombs = nbombs
+        self.seed = seed
+        self.max_chunks = max_chunks
+        self.chunks = {}
+        # for each chunk: its numbers of touched cells (revealed or
+        # flagged), of revealed cells without bomb and of revealed bombs
+        self.stats = {}
+        self.resolved = set()
+        self.layouts = {}
+
+    def bombs (self, cx, cy):
+        """
+        :return: the indexes, in chunk (cx,cy), of its bombs
+        :rtype: list of int
+        """
+        layout = self.layouts.get((cx, cy))
+        if layout is None:
+            if len(self.layouts) >= 9 * self.max_chunks:
+                self.layouts.clear()
+            rng = random.Random('{}:{}:{}'.format(self.seed, cx, cy))
+            layout = rng.sample(range(self.size * self.size), self.nbombs)
+            self.layouts[cx, cy] = layout
+        return layout
+
+    def chunk (self, cx, cy):
+        """
+        :return: the cells of chunk (cx,cy), generated if needed
+        :rtype: bytearray
+        """
+        chunk = self.chunks.get((cx, cy))
+        if chunk is not None:
+            return chunk
+        if len(self.chunks) >= self.max_chunks:
+            self.evict()
+        size = self.size
+        chunk = bytearray(size * size)
+        for i in self.bombs(cx, cy):
+            chunk[i] |= CELL_BOMB
+        for dcx in (-1, 0, 1):
+            for dcy in (-1, 0, 1):
+                for i in self.bombs(cx + dcx, cy + dcy):
+                    bx, by = divmod(i, size)
+                    bx += dcx * size
+                    by += dcy * size
+                    for x in (bx-1, bx, bx+1):
+                        if 0 <= x < size:
+                            for y in (by-1, by, by+1):
+                                if 0 <= y < size and (x != bx or y != by):
+                                    chunk[x*size + y] += 1
+        if (cx, cy) in self.resolved:
+            for i, c in enumerate(chunk):
+                if not c & CELL_BOMB:
+                    chunk[i] = c | CELL_REVEALED
+            nsafe = size * size - self.nbombs
+            self.stats[cx, cy] = [nsafe, nsafe, 0]
+        else:
+            self.stats[cx, cy] = [0, 0, 0]
+        self.chunks[cx, cy] = chunk
+        return chunk
+
+    def evict (self):
+        """
+        forget the chunks which can be generated again: the untouched
+        ones and the resolved ones. They are found from the counters of
+        the chunks, without reading their cells.
+
+        :return: the number of evicted chunks
+        :rtype: int
+        """
+        nsafe = self.size * self.size - self.nbombs
+        evicted = [key for key, (touched, revealed, exploded) in self.stats.items()
+                   if not touched or (not exploded and revealed == nsafe)]
+        for key in evicted:
+            if self.stats[key][0]:
+                self.resolved.add(key)
+            del self.chunks[key]
+            del self.stats[key]
+        return len(evicted)
+
+    def __getitem__ (self, key):
+        cx, x = divmod(key[0], self.size)
+        cy, y = divmod(key[1], self.size)
+        return self.chunk(cx, cy)[x*self.size + y]
+
+    def __setitem__ (self, key, value):
+        cx, x = divmod(key[0], self.size)
+        cy, y = divmod(key[1], self.size)
+        chunk = self.chunk(cx, cy)
+        i = x*self.size + y
+        c = chunk[i]
+        chunk[i] = value
+        if (c ^ value) & (CELL_REVEALED | CELL_HYPOTHETIC):
+            stats = self.stats[cx, cy]
+            touched = CELL_REVEALED | CELL_HYPOTHETIC
+            stats[0] += bool(value & touched) - bool(c & touched)
+            if c & CELL_REVEALED:
+                stats[2 if c & CELL_BOMB else 1] -= 1
+            if value & CELL_REVEALED:
+                stats[2 if value & CELL_BOMB else 1] += 1
+
+    def __len__ (self):
+        return len(self.chunks) * self.size * self.size
+
+
+def make_infinite_game (chunk_size=32, density=0.16, seed=None, max_chunks=1024):
+    """
+    return an infinite minesweeper game. Its grid is made of chunks of
+    chunk_size*chunk_size cells generated on demand (see
+    :class:`ChunkedGrid`), so cells of any (possibly negative)
+    coordinates can be used. An infinite game can be lost but never won.
+
+    :param chunk_size: [optional] side of a chunk (default = 32)
+    :type chunk_size: int
+    :param density: [optional] proportion of bombs (default = 0.16)
+    :type density: float
+    :param seed: [optional] seed of the game, random if None
+    :type seed: int
+    :param max_chunks: [optional] number of chunks kept in memory above
+                       which evictable chunks are forgotten (default = 1024)
+    :type max_chunks: int
+    :return: a fresh infinite game
+    :UC: 0 < chunk_size and 0.12 <= density < 1, the lower bound
+         ensuring that :func:`reveal_all_cells_from` can't spread over
+         an infinite region without bombs
+    """
+    assert 0 < chunk_size, 'chunk_size must be a positive integer'
+    assert 0.12 <= density < 1, 'density must be in [0.12, 1['
+    if seed is None:
+        seed = random.getrandbits(64)
+    nbombs = round(density * chunk_size * chunk_size)
+    return {'width' : None,
+            'height' : None,
+            'nbombs' : None,
+            'seed' : seed,
+            'grid' : ChunkedGrid(chunk_size, nbombs, seed, max_chunks),
+            'nsafe' : None,
+            'nrevealed' : 0,
+            'exploded' : False}
+
+def evict_chunks (game):
+    """
+    :param game: an infinite minesweeper game
+    :type game: game
+    :return: the number of chunks forgotten
+    :rtype: int
+    :Side effect: forget the chunks of game which are untouched or
+                  resolved, they will be generated again when accessed
+    :UC: game is infinite
+    """
+    return game['grid'].evict()
+
+
+##############################################
+# Saved games
+##############################################
+
+# magic, version, width, height, nbombs, seed, nrevealed, exploded,
+# topology (index in TOPOLOGIES, 0 in the files written before it),
+# first_click_safe (False in the files written before it)
+__HEADER = struct.Struct('<4sB3xQQQQQ?B?5x')
+__MAGIC = b'MSWP'
+__VERSION = 1
+
+def __bit_table (mask, bit):
+    """
+    :return: the table mapping a cell to ``bit`` if it has one of the
+             bits of mask, 0 otherwise, for ``bytes.translate``
+    :rtype: bytes
+    """
+    return bytes(bit if c & mask else 0 for c in range(256))
+
+def __pack_bits (cells, mask, invert=False):
+    """
+    :return: the bit plane of the bit mask of cells, bit i of the plane
+             (bit i%8 of byte i//8) standing for cell i
+    :rtype: bytes
+    """
+    n = len(cells)
+    cells = bytes(cells) + bytes(-n % 8)
+    plane = 0
+    for j in range(8):
+        table = __bit_table(mask, 1 << j)
+        if invert:
+            table = bytes(b ^ (1 << j) for b in table)
+        plane |= int.from_bytes(cells[j::8].translate(table), 'little')
+    return plane.to_bytes(len(cells) // 8, 'little')
+
+def __pack_counts (cells):
+    """
+    :return: the numbers of bombs in the neighborhood of cells, two per
+             byte, the one of an even cell in the low nibble
+    :rtype: bytes
+    """
+    n = len(cells)
+    cells = bytes(cells) + bytes(n % 2)
+    low = bytes(c & CELL_COUNT for c in range(256))
+    high = bytes((c & CELL_COUNT) << 4 for c in range(256))
+    counts = int.from_bytes(cells[0::2].translate(low), 'little')
+    counts |= int.from_bytes(cells[1::2].translate(high), 'little')
+    return counts.to_bytes(len(cells) // 2, 'little')
+
+
+class PlanarGrid:
+    """
+    A grid read from a buffer in the format written by
+    :func:`save_game`: one bit plane for the bombs, one for the hidden
+    cells and one for the flags, then the numbers of bombs in the
+    neighborhoods on 4 bits per cell.
+
+    Cells are read and written with ``grid[i]``, as bytes encoded like
+    the cells of :func:`make_game` grids, so the buffer can be a
+    memory-mapped file from which only the pages of accessed cells are
+    read.
+    """
+
+    def __init__ (self, buffer, offset, ncells):
+        self.buffer = buffer
+        self.ncells = ncells
+        nbytes = (ncells + 7) // 8
+        self.bombs_offset = offset
+        self.hidden_offset = offset + nbytes
+        self.flags_offset = offset + 2*nbytes
+        self.counts_offset = offset + 3*nbytes
+
+    @staticmethod
+    def size (ncells):
+        """
+        :return: the number of bytes used by the planes of ncells cells
+        :rtype: int
+        """
+        return 3 * ((ncells + 7) // 8) + (ncells + 1) // 2
+
+    def planes (self):
+        """
+        :return: the bombs, hidden, flags and counts planes
+        :rtype: tuple of bytes
+        """
+        end = self.counts_offset + (self.ncells + 1) // 2
+        return (self.buffer[self.bombs_offset:self.hidden_offset],
+                self.buffer[self.hidden_offset:self.flags_offset],
+                self.buffer[self.flags_offset:self.counts_offset],
+                self.buffer[self.counts_offset:end])
+
+    def bombs (self):
+        """
+        :return: the indexes of the cells with a bomb, in grid order
+        :rtype: list of int
+        """
+        plane = self.buffer[self.bombs_offset:self.hidden_offset]
+        return [8*k + j for k, b in enumerate(plane) if b
+                for j in range(8) if b >> j & 1]
+
+    def __getitem__ (self, i):
+        if not 0 <= i < self.ncells:
+            raise IndexError('cell index out of range')
+        buffer = self.buffer
+        byte, bit = i >> 3, 1 << (i & 7)
+        c = buffer[self.counts_offset + (i >> 1)]
+        c = c >> 4 if i & 1 else c & CELL_COUNT
+        if buffer[self.bombs_offset + byte] & bit:
+            c |= CELL_BOMB
+        if not buffer[self.hidden_offset + byte] & bit:
+            c |= CELL_REVEALED
+        if buffer[self.flags_offset + byte] & bit:
+            c |= CELL_HYPOTHETIC
+        return c
+
+    def __setitem__ (self, i, value):
+        buffer = self.buffer
+        byte, bit = i >> 3, 1 << (i & 7)
+        for offset, mask in ((self.bombs_offset, CELL_BOMB),
+                             (self.hidden_offset, CELL_REVEALED),
+                             (self.flags_offset, CELL_HYPOTHETIC)):
+            flag = bool(value & mask) != (mask == CELL_REVEALED)
+            if flag:
+                buffer[offset + byte] |= bit
+            else:
+                buffer[offset + byte] &= ~bit & 0xFF
+        k = self.counts_offset + (i >> 1)
+        if i & 1:
+            buffer[k] = (buffer[k] & 0x0F) | (value & CELL_COUNT) << 4
+        else:
+            buffer[k] = (buffer[k] & 0xF0) | (value & CELL_COUNT)
+
+    def __len__ (self):
+        return self.ncells
+
+    def __iter__ (self):
+        return (self[i] for i in range(self.ncells))
+
+
+def save_game (game, filename):
+    """
+    save a game in a binary file: a header holding its width, height,
+    number of bombs, seed and counters followed by the bit planes of a
+    :class:`PlanarGrid`. A game of n cells takes about n*7/8 bytes.
+
+    :param game: a minesweeper game
+    :type game: game
+    :param filename: name of the file to write
+    :type filename: str
+    :return: None
+    :rtype: NoneType
+    :UC: game is not infinite nor sparse
+    """
+    grid = game['grid']
+    if isinstance(grid, PlanarGrid):
+        planes = grid.planes()
+    else:
+        planes = (__pack_bits(grid, CELL_BOMB),
+                  __pack_bits(grid, CELL_REVEALED, invert=True),
+                  __pack_bits(grid, CELL_HYPOTHETIC),
+                  __pack_counts(grid))
+    with open(filename, 'wb') as f:
+        f.write(__HEADER.pack(__MAGIC, __VERSION,
+                              get_width(game), get_height(game), game['nbombs'],
+                              game['seed'], game['nrevealed'], game['exploded'],
+                              TOPOLOGIES.index(game.get('topology', 'square')),
+                              game.get('first_click_safe', False)))
+        for plane in planes:
+            f.write(plane)
+
+def load_game (filename, use_mmap=True):
+    """
+    load a game saved by :func:`save_game`.
+
+    :param filename: name of the file to read
+    :type filename: str
+    :param use_mmap: [optional] map the file in memory instead of reading
+                     it, so that a huge game opens instantly and only
+                     the accessed cells are read (default = True). The
+                     mapping is private: playing doesn't modify the file.
+    :type use_mmap: bool
+    :return: the saved game
+    :UC: filename is a file written by :func:`save_game`
+
+    >>> import os, tempfile
+    >>> game = make_game(9, 9, 10, seed=1)
+    >>> _ = reveal_all_cells_from(game, 4, 4)
+    >>> set_hypothetic(get_cell(game, 8, 8))
+    >>> filename = os.path.join(tempfile.mkdtemp(), 'game.msw')
+    >>> save_game(game, filename)
+    >>> for use_mmap in (True, False):
+    ...     loaded = load_game(filename, use_mmap)
+    ...     print(bytes(loaded['grid']) == game['grid'], loaded['nrevealed'] == game['nrevealed'],
+    ...           get_bombs_grid(loaded) == get_bombs_grid(game))
+    True True True
+    True True True
+
+    The bombs of a ``first_click_safe`` game not played yet still move
+    away from the first click once loaded:
+
+    >>> game = make_game(9, 9, 10, seed=1, first_click_safe=True)
+    >>> save_game(game, filename)
+    >>> loaded = load_game(filename)
+    >>> loaded['first_click_safe']
+    True
+    >>> reveal_all_cells_from(loaded, 4, 4) == reveal_all_cells_from(game, 4, 4)
+    True
+    >>> get_bombs_grid(loaded) == get_bombs_grid(game)
+    True
+    """
+    with open(filename, 'rb') as f:
+        if use_mmap:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        else:
+            buffer = bytearray(f.read())
+    magic, version, width, height, nbombs, seed, nrevealed, exploded, topology, first_click_safe = \
+        __HEADER.unpack_from(buffer)
+    assert magic == __MAGIC and version == __VERSION, 'not a saved game'
+    ncells = width*height
+    assert len(buffer) == __HEADER.size + PlanarGrid.size(ncells), 'truncated game'
+    return {'width' : width,
+            'height' : height,
+            'nbombs' : nbombs,
+            'seed' : seed,
+            'grid' : PlanarGrid(buffer, __HEADER.size, ncells),
+            'bombs' : None,
+            'nsafe' : ncells - nbombs,
+            'nrevealed' : nrevealed,
+            'exploded' : exploded,
+            'first_click_safe' : first_click_safe,
+            'topology' : TOPOLOGIES[topology]}
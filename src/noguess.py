@@ -0,0 +1,248 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`noguess` module
+
+This module generates minesweeper games which can be won without ever
+guessing: the start cell has no bomb around it, and from there
+:func:`solver.solve` always finds a safe cell to reveal until the game
+is won.
+
+Candidate games are generated and tested by seed in a pool of
+processes, shared by all the searches; the first accepted seed, in the
+order the seeds were drawn, gives the game, so the result only depends
+on the seed of the search.
+Only seeds travel between processes, the accepted game is generated
+again from its seed.
+
+A background thread can keep a few accepted seeds ready for the common
+sizes of games (see :func:`start_cache`), so that :func:`make_game`
+answers immediately for them.
+"""
+
+import os
+import random
+import threading
+import minesweeper as ms
+import solver
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+#: the usual (width, height, nbombs) games: beginner, intermediate, expert
+COMMON_SIZES = [(9, 9, 10), (16, 16, 40), (30, 16, 99)]
+#: the default number of candidate seeds tested before :func:`find_seed` gives up
+MAX_SEEDS = 10000
+
+# the pools of processes testing the seeds, by number of processes
+__executors = {}
+__executors_lock = threading.Lock()
+
+# accepted seeds by (width, height, nbombs, start)
+__cache = {}
+# the thread filling the cache and the event stopping it
+__filler = None
+__stop = threading.Event()
+
+
+def default_start (width, height):
+    """
+    :return: the start cell of the games of size width*height, their center
+    :rtype: tuple
+    """
+    return (height // 2, width // 2)
+
+def is_solvable (width, height, nbombs, seed, start):
+    """
+    :param width: width of the game
+    :type width: int
+    :param height: height of the game
+    :type height: int
+    :param nbombs: number of bombs
+    :type nbombs: int
+    :param seed: seed of the game
+    :type seed: int
+    :param start: the start cell
+    :type start: tuple
+    :return: ``True`` if the game of this seed has no bomb around start
+             and can be won from start without guessing
+    :rtype: bool
+    """
+    game = ms.make_game(width, height, nbombs, seed=seed)
+    x, y = start
+    cell = ms.get_cell(game, x, y)
+    if ms.is_bomb(cell) or ms.number_of_bombs_in_neighborhood(cell) != 0:
+        return False
+    ms.reveal_all_cells_from(game, x, y)
+    while ms.get_state(game) == ms.GameState.unfinished:
+        safe = [(x, y) for x, y, c in solver.solve(game) if c == 'R']
+        if not safe:
+            return False
+        for x, y in safe:
+            ms.reveal_all_cells_from(game, x, y)
+    return True
+
+def __check (args):
+    """
+    :func:`is_solvable` with packed arguments, for the pool's map.
+    """
+    return is_solvable(*args)
+
+def __executor (workers):
+    """
+    :return: the pool of workers processes, created on first use
+    :rtype: concurrent.futures.ProcessPoolExecutor
+    """
+    with __executors_lock:
+        executor = __executors.get(workers)
+        if executor is None:
+            executor = __executors[workers] = ProcessPoolExecutor(max_workers=workers)
+        return executor
+
+def find_seed (width, height, nbombs, start=None, seed=None, workers=None, batch=None,
+               max_seeds=MAX_SEEDS):
+    """
+    search the seed of a game solvable without guessing, testing batches
+    of candidate seeds in a pool of processes.
+
+    :param width: width of the game
+    :type width: int
+    :param height: height of the game
+    :type height: int
+    :param nbombs: number of bombs
+    :type nbombs: int
+    :param start: [optional] the start cell (default = the center)
+    :type start: tuple
+    :param seed: [optional] seed of the search, random if None
+    :type seed: int
+    :param workers: [optional] number of processes (default = one per core)
+    :type workers: int
+    :param batch: [optional] number of candidates per batch
+                  (default = 8 per process)
+    :type batch: int
+    :param max_seeds: [optional] number of candidates tested before
+                      giving up (default = :data:`MAX_SEEDS`)
+    :type max_seeds: int
+    :return: the first accepted seed
+    :rtype: int
+    :raise ValueError: if none of max_seeds candidates is accepted, as
+                       when no solvable game of this size exists
+    :UC: nbombs leaves the 3x3 square around start free
+    """
+    if start is None:
+        start = default_start(width, height)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if batch is None:
+        batch = 8 * workers
+    rng = random.Random(seed)
+    executor = __executor(workers)
+    tested = 0
+    while tested < max_seeds:
+        seeds = [rng.getrandbits(64) for _ in range(min(batch, max_seeds - tested))]
+        tested += len(seeds)
+        tasks = [(width, height, nbombs, s, start) for s in seeds]
+        results = executor.map(__check, tasks, chunksize=8)
+        for s, ok in zip(seeds, results):
+            if ok:
+                # cancel the rest of the batch
+                results.close()
+                return s
+    raise ValueError('no game solvable without guessing in %d seeds' % max_seeds)
+
+def make_game (width=30, height=20, nbombs=99, start=None, seed=None, workers=None):
+    """
+    return a minesweeper game which can be won without guessing from
+    its start cell, stored in the game as ``start``. The game is taken
+    from the cache when one is ready, or searched by :func:`find_seed`.
+
+    :param width: [optional] horizontal size of game (default = 30)
+    :type width: int
+    :param height: [optional] vertical size of game (default = 20)
+    :type height: int
+    :param nbombs: [optional] number of bombs (default = 99)
+    :type nbombs: int
+    :param start: [optional] the start cell (default = the center)
+    :type start: tuple
+    :param seed: [optional] seed of the search, random if None; the
+                 cache is not used when a seed is given
+    :type seed: int
+    :param workers: [optional] number of processes (default = one per core)
+    :type workers: int
+    :return: a fresh game
+    :raise ValueError: see :func:`find_seed`
+    :UC: see :func:`find_seed`
+    """
+    if start is None:
+        start = default_start(width, height)
+    game_seed = None
+    ready = __cache.get((width, height, nbombs, start))
+    if seed is None and ready is not None:
+        try:
+            game_seed = ready.popleft()
+        except IndexError:
+            pass
+    if game_seed is None:
+        game_seed = find_seed(width, height, nbombs, start, seed, workers)
+    game = ms.make_game(width, height, nbombs, seed=game_seed)
+    game['start'] = start
+    return game
+
+def __fill (sizes, depth, workers):
+    """
+    the loop of the thread filling the cache, until it is stopped.
+    """
+    while not __stop.is_set():
+        missing = [key for key in sizes if len(__cache[key]) < depth]
+        if not missing:
+            __stop.wait(0.1)
+            continue
+        for key in missing:
+            width, height, nbombs, start = key
+            try:
+                __cache[key].append(find_seed(width, height, nbombs, start, workers=workers))
+            except ValueError:
+                # no solvable game of this size, stop trying
+                sizes.remove(key)
+            if __stop.is_set():
+                break
+
+def start_cache (sizes=COMMON_SIZES, depth=4, workers=None):
+    """
+    start a background thread keeping depth games solvable without
+    guessing ready for each size of sizes, with the default start cell.
+
+    :param sizes: [optional] the (width, height, nbombs) of the games
+                  (default = :data:`COMMON_SIZES`)
+    :type sizes: list of tuple
+    :param depth: [optional] number of games ready per size (default = 4)
+    :type depth: int
+    :param workers: [optional] number of processes used by the thread
+    :type workers: int
+    :return: None
+    :rtype: NoneType
+    :Side effect: replace the running cache thread, if any
+    """
+    global __filler
+    stop_cache()
+    keys = [(w, h, n, default_start(w, h)) for w, h, n in sizes]
+    for key in keys:
+        __cache.setdefault(key, deque())
+    __stop.clear()
+    __filler = threading.Thread(target=__fill, args=(keys, depth, workers),
+                                name='noguess-cache', daemon=True)
+    __filler.start()
+
+def stop_cache ():
+    """
+    stop the background thread filling the cache, if any. The games
+    already in the cache remain available.
+
+    :return: None
+    :rtype: NoneType
+    """
+    global __filler
+    if __filler is not None:
+        __stop.set()
+        __filler.join()
+        __filler = None
@@ -0,0 +1,269 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`server` module
+
+This module hosts many minesweeper games in a single process: an
+asyncio TCP server gives a game to each connection and plays the moves
+it receives.
+
+The protocol is made of lines of ASCII text. The client sends:
+
+* ``N width,height,nbombs`` to start a new game (the first move of the
+  game cannot hit a bomb), or ``N width,height,nbombs,U`` to start one
+  whose moves can be undone,
+* ``x,y,C`` to play a move, with the syntax of :mod:`console_main`: C is
+  ``R`` (reveal), ``S`` (set a flag), ``U`` (unset a flag) or ``C``
+  (chord),
+* ``Z`` and ``Y`` to undo and redo a move, in the games started with
+  ``U`` only: the other games keep no history of their moves,
+* several of these moves separated by ``;``, played in a single pass
+  by :func:`minesweeper.apply_moves`,
+* ``Q`` to close the connection.
+
+The server answers each line with a single line:
+
+* ``OK width,height,nbombs`` (followed by ``,U`` if asked) to ``N``,
+* for moves, the state of the game (``U`` unfinished, ``W`` won or
+  ``L`` lost) followed by the cells changed by the moves, as
+  ``x,y,v`` separated by spaces, where v is what the cell shows: its
+  number of bombs around, ``B`` for a bomb, ``?`` for a flag or ``.``
+  for a hidden cell,
+* ``E message`` when the line is invalid. A line longer than
+  :data:`MAX_LINE` bytes is answered by an error and closes the
+  connection.
+
+For instance::
+
+    > N 9,9,10
+    < OK 9,9,10
+    > 0,0,R
+    < U 0,0,0 0,1,1 1,0,1 1,1,2
+
+From the command line::
+
+    python3 server.py [port]
+"""
+
+import sys
+import asyncio
+import minesweeper as ms
+
+#: default port of the server
+PORT = 7777
+#: size of the queue of connections waiting to be accepted
+BACKLOG = 4096
+#: largest accepted game, in cells
+MAX_CELLS = 1000*1000
+#: largest game, in cells, played on the event loop; the lines of larger
+#: games are played in a thread, so they don't delay the other games
+LOOP_CELLS = 100*100
+#: longest accepted line, in bytes
+MAX_LINE = 64*1024
+
+__STATES = {ms.GameState.unfinished : 'U',
+            ms.GameState.winning : 'W',
+            ms.GameState.losing : 'L'}
+
+
+def cell_value (game, x, y):
+    """
+    :param game: a minesweeper game
+    :type game: game
+    :param x: x-coordinate of a cell
+    :type x: int
+    :param y: y-coordinate of a cell
+    :type y: int
+    :return: what cell (x,y) shows to the player: ``'0'`` to ``'8'``,
+             ``'B'``, ``'?'`` or ``'.'``
+    :rtype: str
+    """
+    cell = ms.get_cell(game, x, y)
+    if ms.is_revealed(cell):
+        if ms.is_bomb(cell):
+            return 'B'
+        return str(ms.number_of_bombs_in_neighborhood(cell))
+    if ms.is_hypothetic_bomb(cell):
+        return '?'
+    return '.'
+
+def diff (game, cells):
+    """
+    :param game: a minesweeper game
+    :type game: game
+    :param cells: the coordinates of the cells changed by a move
+    :type cells: list of tuple
+    :return: the answer to the move: the state of the game and the
+             changed cells
+    :rtype: str
+    """
+    parts = [__STATES[ms.get_state(game)]]
+    parts.extend('{},{},{}'.format(x, y, cell_value(game, x, y)) for x, y in cells)
+    return ' '.join(parts)
+
+def __parse_new (command):
+    """
+    :param command: a ``N`` line, in upper case
+    :type command: str
+    :return: the width, height and number of bombs of the game, and
+             ``True`` if its moves can be undone
+    :rtype: tuple (int, int, int, bool)
+    :raise ValueError: if the line is not ``N width,height,nbombs[,U]``
+    """
+    fields = [field.strip() for field in command[1:].split(',')]
+    undo = len(fields) == 4 and fields[3] == 'U'
+    if undo:
+        fields.pop()
+    width, height, nbombs = (int(n) for n in fields)
+    return width, height, nbombs, undo
+
+def answer (game, line):
+    """
+    play a line of the protocol.
+
+    :param game: the game of the connection, ``None`` before the first ``N``
+    :type game: game
+    :param line: a line sent by the client, without its end of line
+    :type line: str
+    :return: the game of the connection and the line to answer
+    :rtype: tuple (game, str)
+    """
+    command = line.strip().upper()
+    if command.startswith('N'):
+        try:
+            width, height, nbombs, undo = __parse_new(command)
+        except ValueError:
+            return game, 'E N needs three integers width,height,nbombs and an optional U'
+        if not (0 < width and 0 < height and width*height <= MAX_CELLS
+                and 0 <= nbombs <= width*height):
+            return game, 'E invalid size of game'
+        game = ms.make_game(width, height, nbombs, first_click_safe=True)
+        game['undoable'] = undo
+        return game, 'OK {},{},{}{}'.format(width, height, nbombs, ',U' if undo else '')
+    if game is None:
+        return game, 'E no game, start one with N width,height,nbombs'
+    if ms.get_state(game) != ms.GameState.unfinished:
+        return game, 'E the game is finished'
+    moves = []
+    for move in command.split(';'):
+        move = move.strip()
+        if move in ('Z', 'Y'):
+            if not game['undoable']:
+                return game, 'E undo needs a game started with N width,height,nbombs,U'
+            moves.append((None, None, move))
+            continue
+        try:
+            x, y, c = move.split(',')
+            x, y = int(x), int(y)
+        except ValueError:
+            return game, 'E a move is x,y,C'
+        if not (0 <= x < ms.get_height(game) and 0 <= y < ms.get_width(game)):
+            return game, 'E the cell is out of the game'
+        if c not in ('R', 'S', 'U', 'C'):
+            return game, 'E C must be R or S or U or C'
+        moves.append((x, y, c))
+    changed, _ = ms.apply_moves(game, moves, record_undo=game['undoable'])
+    return game, diff(game, changed)
+
+def __off_loop (game, line):
+    """
+    :return: ``True`` if the line is for a game larger than
+             :data:`LOOP_CELLS`, the current one or the one it starts
+    :rtype: bool
+    """
+    if game is not None and ms.get_width(game)*ms.get_height(game) > LOOP_CELLS:
+        return True
+    command = line.strip().upper()
+    if not command.startswith('N'):
+        return False
+    try:
+        width, height, _, _ = __parse_new(command)
+    except ValueError:
+        return False
+    return width*height > LOOP_CELLS
+
+async def handle (reader, writer):
+    """
+    play the lines of a connection until it is closed or ``Q`` is
+    received. Each connection has its own game. The lines of the games
+    larger than :data:`LOOP_CELLS` are played in the default executor of
+    the loop.
+
+    :param reader: the stream of the connection
+    :type reader: asyncio.StreamReader
+    :param writer: the stream of the connection
+    :type writer: asyncio.StreamWriter
+    :return: None
+    :rtype: NoneType
+    """
+    game = None
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                writer.write(b'E the line is too long\n')
+                await writer.drain()
+                break
+            if not line or line.strip().upper() == b'Q':
+                break
+            line = line.decode('ascii', 'replace')
+            if __off_loop(game, line):
+                game, reply = await loop.run_in_executor(None, answer, game, line)
+            else:
+                game, reply = answer(game, line)
+            writer.write(reply.encode('ascii') + b'\n')
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+async def start (host='127.0.0.1', port=PORT):
+    """
+    :param host: [optional] the address to listen on (default = localhost)
+    :type host: str
+    :param port: [optional] the port to listen on, 0 for any free port
+                 (default = :data:`PORT`)
+    :type port: int
+    :return: the listening server
+    :rtype: asyncio.Server
+    """
+    return await asyncio.start_server(handle, host, port, backlog=BACKLOG, limit=MAX_LINE)
+
+async def serve (host='127.0.0.1', port=PORT, pool=True):
+    """
+    run the server until it is cancelled.
+
+    :param host: [optional] the address to listen on (default = localhost)
+    :type host: str
+    :param port: [optional] the port to listen on (default = :data:`PORT`)
+    :type port: int
+    :param pool: [optional] keep boards of the sizes asked by the clients
+                 ready in the background, see :func:`minesweeper.start_pool`
+                 (default = True)
+    :type pool: bool
+    :return: None
+    :rtype: NoneType
+    """
+    if pool:
+        ms.start_pool()
+    server = await start(host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if pool:
+            ms.stop_pool()
+
+
+if __name__ == '__main__':
+    try:
+        port = int(sys.argv[1]) if len(sys.argv) == 2 else PORT
+        asyncio.run(serve(port=port))
+    except ValueError:
+        print("port must be an integer")
+    except KeyboardInterrupt:
+        pass
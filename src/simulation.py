@@ -0,0 +1,183 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`simulation` module
+
+This module plays minesweeper games without any display, to evaluate
+strategies. A strategy is a *bot*: a function taking a game and a
+``random.Random`` generator and returning the next action ``(x, y, c)``
+where ``c`` is ``'R'`` (reveal), ``'S'`` (set a flag) or ``'U'`` (unset
+a flag), as in :mod:`console_main`.
+
+:func:`run` plays many games of the same size with a bot, spread over a
+pool of processes (one per core), and aggregates the results. Each game
+gets its own seed, derived from the seed of the run, so a run can be
+reproduced exactly.
+
+A bot must be defined at the top level of a module to be sent to the
+worker processes.
+
+From the command line::
+
+    python3 simulation.py ngames width height nbombs [bot]
+"""
+
+import os
+import sys
+import time
+import random
+import minesweeper as ms
+import solver
+from concurrent.futures import ProcessPoolExecutor
+
+
+def random_bot (game, rng):
+    """
+    a bot revealing a random hidden cell.
+
+    :param game: a minesweeper game
+    :type game: game
+    :param rng: a random generator
+    :type rng: random.Random
+    :return: the action to play
+    :rtype: tuple (x, y, c)
+    :UC: game is unfinished
+    """
+    width, height = ms.get_width(game), ms.get_height(game)
+    for _ in range(16):
+        x, y = rng.randrange(height), rng.randrange(width)
+        if not ms.is_revealed(ms.get_cell(game, x, y)):
+            return (x, y, 'R')
+    hidden = [(x, y) for x in range(height) for y in range(width)
+              if not ms.is_revealed(ms.get_cell(game, x, y))]
+    x, y = rng.choice(hidden)
+    return (x, y, 'R')
+
+#: the bots known by name from the command line
+BOTS = {'random' : random_bot,
+        'solver' : solver.solver_bot}
+
+
+def play_game (width, height, nbombs, bot, seed, max_moves=None):
+    """
+    play a game with a bot until it is finished.
+
+    :param width: width of the game
+    :type width: int
+    :param height: height of the game
+    :type height: int
+    :param nbombs: number of bombs
+    :type nbombs: int
+    :param bot: the bot
+    :type bot: function
+    :param seed: seed of the game and of the bot's generator
+    :type seed: int
+    :param max_moves: [optional] number of moves after which the game is
+                      abandoned (default = no limit)
+    :type max_moves: int
+    :return: the final state and the duration in seconds of each move
+             (the bot's decision and its application)
+    :rtype: tuple (GameState, list of float)
+    """
+    game = ms.make_game(width, height, nbombs, seed=seed)
+    # the bot's generator must not replay the draws which placed the bombs
+    rng = random.Random('bot:{}'.format(seed))
+    latencies = []
+    state = ms.get_state(game)
+    clock = time.perf_counter
+    while state == ms.GameState.unfinished and len(latencies) != max_moves:
+        start = clock()
+        x, y, c = bot(game, rng)
+        if c == 'R':
+            ms.reveal_all_cells_from(game, x, y)
+        elif c == 'S':
+            ms.set_hypothetic(ms.get_cell(game, x, y))
+        elif c == 'U':
+            ms.unset_hypothetic(ms.get_cell(game, x, y))
+        state = ms.get_state(game)
+        latencies.append(clock() - start)
+    return state, latencies
+
+def __play (args):
+    """
+    :func:`play_game` with packed arguments, for the pool's map.
+    """
+    return play_game(*args)
+
+def percentile (values, p):
+    """
+    :param values: some numbers
+    :type values: list
+    :param p: a percentage
+    :type p: float
+    :return: the value under which are p% of values (nearest rank)
+    :rtype: float
+    :UC: values is sorted and not empty, 0 <= p <= 100
+    """
+    k = max(0, -(-len(values) * p // 100) - 1)
+    return values[int(k)]
+
+def run (ngames, width, height, nbombs, bot=random_bot, seed=0,
+         workers=None, max_moves=None):
+    """
+    play ngames games with a bot in a pool of processes and aggregate
+    their results. Game i is played with seed ``seed + i``.
+
+    :param ngames: number of games
+    :type ngames: int
+    :param width: width of the games
+    :type width: int
+    :param height: height of the games
+    :type height: int
+    :param nbombs: number of bombs of the games
+    :type nbombs: int
+    :param bot: [optional] the bot (default = :func:`random_bot`)
+    :type bot: function
+    :param seed: [optional] seed of the run (default = 0)
+    :type seed: int
+    :param workers: [optional] number of processes (default = one per core)
+    :type workers: int
+    :param max_moves: [optional] maximal number of moves of a game
+    :type max_moves: int
+    :return: a dict with the number of games, of wins, the win rate, the
+             mean number of moves per game, the mean, median, 99th
+             percentile and maximal latencies of a move in seconds, and
+             the wall-clock duration of the run
+    :rtype: dict
+    :UC: 0 < ngames
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    tasks = [(width, height, nbombs, bot, seed + i, max_moves) for i in range(ngames)]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(__play, tasks,
+                                    chunksize=max(1, ngames // (4*workers))))
+    duration = time.perf_counter() - start
+    wins = sum(1 for state, _ in results if state == ms.GameState.winning)
+    latencies = sorted(l for _, moves in results for l in moves)
+    return {'games' : ngames,
+            'wins' : wins,
+            'win_rate' : wins / ngames,
+            'moves_per_game' : len(latencies) / ngames,
+            'latency_mean' : sum(latencies) / max(1, len(latencies)),
+            'latency_p50' : percentile(latencies, 50) if latencies else 0.0,
+            'latency_p99' : percentile(latencies, 99) if latencies else 0.0,
+            'latency_max' : latencies[-1] if latencies else 0.0,
+            'duration' : duration}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) in (5, 6):
+        try:
+            n, w, h, b = (int(arg) for arg in sys.argv[1:5])
+            bot = BOTS[sys.argv[5] if len(sys.argv) == 6 else 'random']
+            for key, value in run(n, w, h, b, bot).items():
+                print("{}: {}".format(key, value))
+        except ValueError:
+            print("arguments must be integers")
+        except KeyError:
+            print("bot must be one of", ", ".join(BOTS))
+    else:
+        print("usage: simulation.py ngames width height nbombs [bot]")
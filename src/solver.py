@@ -0,0 +1,217 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`solver` module
+
+This module deduces, from the numbers revealed in a minesweeper game,
+the hidden cells which are certainly safe and those which certainly
+contain a bomb. It only uses what a player can see: bombs and flags
+are never read.
+
+Each revealed number with hidden neighbors is a constraint: among its
+hidden neighbors there are exactly ``count`` bombs. The neighbors of a
+constraint are stored as a small int bitmask in a frame of 8 bits per
+row around the number: bit ``(dx+2)*8 + dy+3`` stands for the cell
+``(x+dx, y+dy)`` of the number ``(x, y)``. Masks of two constraints at
+most 2 rows and 2 columns apart are aligned with a single shift of
+``ddx*8 + ddy``, which keeps every cell of both in the frame, then the
+subset and overlap rules are a few int operations:
+
+* a constraint with ``count`` bombs among ``count`` cells only has
+  bombs, one with no bomb only has safe cells;
+* for two constraints A and B, if B has ``|B\\A|`` bombs more than A,
+  all the cells of ``B\\A`` are bombs and all the cells of ``A\\B`` are
+  safe (this covers the subset rule, where ``A\\B`` is empty).
+
+Each deduction is propagated to the constraints containing the cell
+until nothing more can be deduced.
+
+This module uses from :mod:`minesweeper`:
+
+* :func:`minesweeper.get_width`
+* :func:`minesweeper.get_height`
+* :func:`minesweeper.neighbors_function`
+* the cell encoding of grids (:data:`minesweeper.CELL_REVEALED`, ...)
+"""
+
+import minesweeper as ms
+
+
+def __bits (mask):
+    """
+    :return: the positions of the bits set in mask
+    :rtype: generator of int
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def __cells (game):
+    """
+    :return: the cells of the game's grid
+    :rtype: bytes or bytearray
+    """
+    grid = game['grid']
+    if isinstance(grid, (bytes, bytearray)):
+        return grid
+    return bytes(grid[i] for i in range(len(grid)))
+
+def solve (game):
+    """
+    :param game: a minesweeper game
+    :type game: game
+    :return: the deductions from the revealed numbers of game, in grid
+             order: ``(x, y, 'R')`` for a hidden safe cell, to reveal with
+             :func:`minesweeper.reveal_all_cells_from`, and ``(x, y, 'S')``
+             for an unflagged cell with a bomb, to flag with
+             :func:`minesweeper.set_hypothetic`
+    :rtype: list of tuple
+    :UC: game is not infinite nor sparse and its topology is ``'square'``
+
+    >>> game = ms.make_game(30, 16, 99, seed=3, first_click_safe=True)
+    >>> _ = ms.reveal_all_cells_from(game, 8, 15)
+    >>> deductions = solve(game)
+    >>> len(deductions) > 0
+    True
+    >>> all(ms.is_bomb(ms.get_cell(game, x, y)) == (c == 'S') for x, y, c in deductions)
+    True
+    """
+    assert game.get('topology', 'square') == 'square', 'the solver needs a square topology'
+    assert not isinstance(game['grid'], ms.SparseGrid), 'the solver reads every cell, not a sparse grid'
+    width, height = ms.get_width(game), ms.get_height(game)
+    cells = __cells(game)
+    revealed = ms.CELL_REVEALED
+    number = bytes(1 if c & revealed and c & ms.CELL_COUNT and not c & ms.CELL_BOMB else 0
+                   for c in range(256))
+    marks = cells.translate(number)
+
+    neighbors = ms.neighbors_function(game)
+    # the bit of a neighbor of a number, by difference of their indexes,
+    # and the shift aligning two numbers 2 rows and 2 columns apart at most
+    bits = {dx*width + dy : (dx+2)*8 + dy+3 for dx in (-1, 0, 1) for dy in (-1, 0, 1)}
+    shifts = {dx*width + dy : dx*8 + dy for dx in range(-2, 3) for dy in range(-2, 3)
+              if dx or dy}
+    if width < 3:
+        # differences of indexes are ambiguous, use coordinates
+        def bit (j, i):
+            (xj, yj), (xi, yi) = divmod(j, width), divmod(i, width)
+            return (xj-xi+2)*8 + yj-yi+3
+    else:
+        bit = lambda j, i: bits[j - i]
+
+    # the constraints: index of a number -> [mask of its unknown neighbors, bombs among them]
+    constraints = {}
+    i = marks.find(1)
+    while i != -1:
+        mask = 0
+        for j in neighbors(i):
+            if not cells[j] & revealed:
+                mask |= 1 << bit(j, i)
+        if mask:
+            constraints[i] = [mask, cells[i] & ms.CELL_COUNT]
+        i = marks.find(1, i + 1)
+
+    known = {}
+    work = list(constraints)
+    queued = set(work)
+
+    def determine (j, bomb):
+        if j in known:
+            return
+        known[j] = bomb
+        for k in neighbors(j):
+            constraint = constraints.get(k)
+            if constraint is not None:
+                constraint[0] &= ~(1 << bit(j, k))
+                if bomb:
+                    constraint[1] -= 1
+                if k not in queued:
+                    queued.add(k)
+                    work.append(k)
+
+    def cell (center, p):
+        # the index of the cell of bit p in the frame of the number center
+        dx, dy = divmod(p, 8)
+        return center + (dx-2)*width + dy-3
+
+    def close (i):
+        # the close constraints of i, with the shifts aligning them
+        x, y = divmod(i, width)
+        if 2 <= x < height-2 and 2 <= y < width-2:
+            return [(i + d, shift) for d, shift in shifts.items() if i + d in constraints]
+        return [(x1*width + y1, (x1-x)*8 + y1-y)
+                for x1 in range(max(0, x-2), min(height, x+3))
+                for y1 in range(max(0, y-2), min(width, y+3))
+                if (x1 != x or y1 != y) and x1*width + y1 in constraints]
+
+    while work:
+        i = work.pop()
+        queued.discard(i)
+        mask, count = constraints[i]
+        if not mask:
+            continue
+        if count == 0 or count == mask.bit_count():
+            for p in list(__bits(mask)):
+                determine(cell(i, p), count != 0)
+            continue
+        for k, d in close(i):
+            other, other_count = constraints[k]
+            if d >= 0:
+                a, b, center = mask, other << d, i
+            else:
+                a, b, center = mask << -d, other, k
+            if not a & b:
+                continue
+            only_a = a & ~b
+            only_b = b & ~a
+            if other_count - count == only_b.bit_count():
+                bombs, safes = only_b, only_a
+            elif count - other_count == only_a.bit_count():
+                bombs, safes = only_a, only_b
+            else:
+                continue
+            if not bombs and not safes:
+                continue
+            for p in list(__bits(bombs)):
+                determine(cell(center, p), True)
+            for p in list(__bits(safes)):
+                determine(cell(center, p), False)
+            if i not in queued:
+                queued.add(i)
+                work.append(i)
+            break
+
+    deductions = []
+    for j in sorted(known):
+        x, y = divmod(j, width)
+        if not known[j]:
+            deductions.append((x, y, 'R'))
+        elif not cells[j] & ms.CELL_HYPOTHETIC:
+            deductions.append((x, y, 'S'))
+    return deductions
+
+def solver_bot (game, rng):
+    """
+    a bot for :mod:`simulation` which reveals a cell proven safe by
+    :func:`solve`, or else a random hidden cell not proven to be a bomb.
+
+    :param game: a minesweeper game
+    :type game: game
+    :param rng: a random generator
+    :type rng: random.Random
+    :return: the action to play
+    :rtype: tuple (x, y, c)
+    :UC: game is unfinished
+    """
+    deductions = solve(game)
+    for x, y, c in deductions:
+        if c == 'R':
+            return (x, y, c)
+    bombs = {(x, y) for x, y, c in deductions}
+    width, height = ms.get_width(game), ms.get_height(game)
+    hidden = [(x, y) for x in range(height) for y in range(width)
+              if (x, y) not in bombs and not ms.is_revealed(ms.get_cell(game, x, y))]
+    x, y = rng.choice(hidden)
+    return (x, y, 'R')